@@ -0,0 +1,43 @@
+from corpus import synthetic_markdown
+from functions import block_to_block_type, markdown_to_blocks, scan_blocks, strip_markers
+import argparse
+import random
+import time
+
+def multi_pass(markdown):
+    result = []
+    for block in markdown_to_blocks(markdown):
+        block_type = block_to_block_type(block)
+        result.append((block_type, block, strip_markers(block, block_type)))
+    return result
+
+def single_pass(markdown):
+    return list(scan_blocks(markdown.split("\n")))
+
+def best_time(func, markdown, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(markdown)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare scan_blocks with markdown_to_blocks + block_to_block_type + strip_markers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'blocks':>8}{'multi-pass (ms)':>18}{'scan_blocks (ms)':>18}{'speedup':>10}")
+    for size in args.sizes:
+        markdown = synthetic_markdown(random.Random(0), "Benchmark", size, paragraph_words=20)
+        if multi_pass(markdown) != single_pass(markdown):
+            raise Exception(f"scan_blocks disagrees with the multi-pass parser on {size} blocks")
+        old = best_time(multi_pass, markdown, args.repeat)
+        new = best_time(single_pass, markdown, args.repeat)
+        print(f"{size:>8}{old * 1e3:>18.1f}{new * 1e3:>18.1f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
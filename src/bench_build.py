@@ -0,0 +1,130 @@
+from corpus import add_shape_arguments, generate_corpus, shape_from_args
+from functions import (
+    block_to_textnodes,
+    extract_title,
+    find_pages,
+    markdown_to_html_node,
+    rebase_urls,
+    scan_blocks,
+    text_nodes_to_block_node,
+)
+from htmlnode import ParentNode
+from template import load_template
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+STAGES = ["read", "scan_blocks", "text_to_textnodes", "html_nodes", "to_html", "template", "write"]
+RESULTS_VERSION = 1
+
+def run_stages(content_dir, template_path, dest_dir, basepath="/"):
+    # Same steps as generate_page, each one timed on its own
+    clock = time.perf_counter
+    timings = dict.fromkeys(STAGES, 0.0)
+    input_bytes = output_bytes = 0
+    pages = find_pages(content_dir, dest_dir)
+    start = clock()
+    for src, dest in pages:
+        t0 = clock()
+        with open(src, "r", encoding="utf-8") as md_file:
+            md_content = md_file.read()
+        t1 = clock()
+        blocks = list(scan_blocks(md_content.split("\n")))
+        t2 = clock()
+        block_text_nodes = [block_to_textnodes(block_type, block_text) for block_type, _, block_text in blocks]
+        t3 = clock()
+        nodes = [
+            text_nodes_to_block_node(block_type, block, text_nodes)
+            for (block_type, block, _), text_nodes in zip(blocks, block_text_nodes)
+        ]
+        html_node = rebase_urls(ParentNode("div", nodes), basepath)
+        t4 = clock()
+        html_content = html_node.to_html()
+        t5 = clock()
+        template = load_template(template_path, basepath)
+        html_full_page = template.render({"Title": extract_title(md_content), "Content": html_content})
+        t6 = clock()
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "w", encoding="utf-8") as f:
+            f.write(html_full_page)
+        t7 = clock()
+        for stage, elapsed in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5, t7 - t6)):
+            timings[stage] += elapsed
+        input_bytes += len(md_content.encode("utf-8"))
+        output_bytes += len(html_full_page.encode("utf-8"))
+    total = clock() - start
+    return {
+        "pages": len(pages),
+        "input_bytes": input_bytes,
+        "output_bytes": output_bytes,
+        "stages": timings,
+        "total": total,
+        "pages_per_second": len(pages) / total if total else 0.0,
+    }
+
+def check_output(content_dir, basepath="/"):
+    # The staged pipeline above has to produce what markdown_to_html_node does
+    src, _ = find_pages(content_dir, "")[0]
+    with open(src, "r", encoding="utf-8") as md_file:
+        md_content = md_file.read()
+    blocks = list(scan_blocks(md_content.split("\n")))
+    nodes = [text_nodes_to_block_node(t, b, block_to_textnodes(t, text)) for t, b, text in blocks]
+    if ParentNode("div", nodes).to_html() != markdown_to_html_node(md_content).to_html():
+        raise Exception(f"Staged pipeline output differs from markdown_to_html_node for {src}")
+
+def print_results(results, previous=None):
+    header = f"{'stage':<20}{'seconds':>10}{'share':>8}"
+    if previous:
+        header += f"{'previous':>10}{'change':>9}"
+    print(header)
+    for stage in STAGES:
+        seconds = results["stages"][stage]
+        row = f"{stage:<20}{seconds:>10.3f}{seconds / results['total']:>8.1%}"
+        if previous and stage in previous["stages"]:
+            old = previous["stages"][stage]
+            row += f"{old:>10.3f}{(seconds - old) / old if old else 0:>+9.1%}"
+        print(row)
+    print(
+        f"{results['pages']} pages in {results['total']:.3f}s, "
+        f"{results['pages_per_second']:.0f} pages/s, "
+        f"{results['input_bytes']} bytes read, {results['output_bytes']} bytes written"
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each build stage on a synthetic content tree")
+    add_shape_arguments(parser)
+    parser.add_argument("--basepath", default="/")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--keep", help="generate the corpus and output in this folder instead of a temporary one")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.keep or tmp
+        corpus = generate_corpus(root, shape_from_args(args))
+        content_dir = os.path.join(root, "content")
+        check_output(content_dir, args.basepath)
+        results = run_stages(content_dir, os.path.join(root, "template.html"), os.path.join(root, "docs"), args.basepath)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "corpus": corpus["shape"],
+        **results,
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
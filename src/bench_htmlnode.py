@@ -0,0 +1,59 @@
+from htmlnode import LeafNode, ParentNode
+import argparse
+import sys
+import time
+
+# Serializer ParentNode.to_html used before it moved to a single buffer, kept
+# here as the baseline: every level copies its whole subtree string again.
+def legacy_to_html(node):
+    if isinstance(node, LeafNode):
+        return node.to_html()
+    s = f"<{node.tag}{node.props_to_html()}></{node.tag}>"
+    temp_s = ""
+    for child in node.children:
+        temp_s += legacy_to_html(child)
+    return s.replace("><", f">{temp_s}<")
+
+def deep_tree(size):
+    node = LeafNode("b", "leaf")
+    for _ in range(size - 1):
+        node = ParentNode("span", [node])
+    return node
+
+def wide_tree(size):
+    return ParentNode("div", [LeafNode("span", f"child {i}") for i in range(size - 1)])
+
+def best_time(func, node, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(node)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time ParentNode.to_html on deep and wide trees")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 4000, 8000, 16000, 32000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # The legacy serializer recurses once per level
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    legacy_max_depth = 8000
+    print(f"{'shape':<6}{'nodes':>8}{'to_html (ms)':>14}{'ns/node':>10}{'legacy (ms)':>14}{'ns/node':>10}")
+    for shape, build in (("deep", deep_tree), ("wide", wide_tree)):
+        for size in args.sizes:
+            node = build(size)
+            new = best_time(lambda n: n.to_html(), node, args.repeat)
+            row = f"{shape:<6}{size:>8}{new * 1e3:>14.2f}{new * 1e9 / size:>10.0f}"
+            if shape == "wide" or size <= legacy_max_depth:
+                old = best_time(legacy_to_html, node, args.repeat)
+                row += f"{old * 1e3:>14.2f}{old * 1e9 / size:>10.0f}"
+            else:
+                row += f"{'-':>14}{'-':>10}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from corpus import synthetic_markdown
+from functions import markdown_to_html_node, scan_blocks, text_to_textnodes
+from htmlnode import LeafNode, ParentNode
+from textnode import BlockType, TextNode
+import argparse
+import random
+import tracemalloc
+
+# Node layout before __slots__: a per-instance __dict__ and fresh containers
+class DictTextNode():
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class DictHTMLNode():
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children if children is not None else []
+        self.props = props if props is not None else {}
+
+def clone_html(node, node_class):
+    # Same shape, strings and props contents, rebuilt with node_class
+    children = None
+    if isinstance(node, ParentNode):
+        children = [clone_html(child, node_class) for child in node.children]
+    props = dict(node.props) if node.props else None
+    if node_class is DictHTMLNode:
+        return DictHTMLNode(node.tag, node.value, children, props)
+    if children is None:
+        return LeafNode(node.tag, node.value, props)
+    return ParentNode(node.tag, children, props)
+
+def clone_text(nodes, node_class):
+    return [node_class(node.text, node.text_type, node.url) for node in nodes]
+
+def count_html(node):
+    return 1 + sum(count_html(child) for child in node.children)
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bytes per node of the node classes on a synthetic corpus")
+    parser.add_argument("--blocks", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    markdown = synthetic_markdown(random.Random(0), "Benchmark", args.blocks, paragraph_words=20)
+    tree = markdown_to_html_node(markdown)
+    text_nodes = []
+    for block_type, _, block_text in scan_blocks(markdown.split("\n")):
+        if block_type != BlockType.CODE:
+            for line in block_text.split("\n"):
+                text_nodes.extend(text_to_textnodes(line))
+
+    html_count = count_html(tree)
+    print(f"{args.blocks} blocks: {html_count} html nodes, {len(text_nodes)} text nodes")
+    print(f"{'class':<12}{'before (B/node)':>18}{'after (B/node)':>18}{'saved':>8}")
+    rows = (
+        ("HTMLNode", html_count, lambda: clone_html(tree, DictHTMLNode), lambda: clone_html(tree, ParentNode)),
+        ("TextNode", len(text_nodes), lambda: clone_text(text_nodes, DictTextNode), lambda: clone_text(text_nodes, TextNode)),
+    )
+    for name, count, build_before, build_after in rows:
+        _, before = measure(build_before)
+        _, after = measure(build_after)
+        print(f"{name:<12}{before / count:>18.1f}{after / count:>18.1f}{1 - after / before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from concurrent.futures import ProcessPoolExecutor
+from incremental import load_manifest, save_manifest
+from output import write_if_changed
+from parallel import default_jobs
+from profiling import NULL_PROFILER
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".json", ".xml", ".svg", ".txt")
+# Below this a compressed response saves less than the extra request headers
+DEFAULT_MIN_SIZE = 1024
+# The variants written by the last run, the only files a later run may remove
+DEFAULT_VARIANT_CACHE = os.path.join(".cache", "compressed.json")
+VARIANT_CACHE_VERSION = 1
+
+def gzip_compress(data):
+    # mtime=0 keeps the output the same from build to build
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def brotli_compress(data):
+    return brotli.compress(data, quality=11)
+
+def zstd_compress(data):
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+def available_codecs():
+    codecs = {".gz": gzip_compress}
+    if brotli is not None:
+        codecs[".br"] = brotli_compress
+    if zstandard is not None:
+        codecs[".zst"] = zstd_compress
+    return codecs
+
+def remove_variant(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def compress_file(path, suffixes, min_size=DEFAULT_MIN_SIZE, owned=()):
+    # Writes path + suffix for every codec, each variant gets the source's
+    # mtime so an unchanged source is recognised without reading anything.
+    # The variants left in place are listed under "variants". Only the owned
+    # variants, the ones an earlier run wrote, are ever removed
+    codecs = available_codecs()
+    stats = {"compressed": 0, "unchanged": 0, "small": 0, "bytes_saved": 0, "variants": []}
+    stat = os.stat(path)
+    if stat.st_size < min_size:
+        # A stale variant would still be served for the smaller file
+        for suffix in suffixes:
+            if path + suffix in owned:
+                remove_variant(path + suffix)
+        stats["small"] = 1
+        return stats
+    data = None
+    for suffix in suffixes:
+        variant = path + suffix
+        try:
+            if os.stat(variant).st_mtime_ns == stat.st_mtime_ns:
+                stats["unchanged"] += 1
+                stats["variants"].append(variant)
+                continue
+        except FileNotFoundError:
+            pass
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        compressed = codecs[suffix](data)
+        if len(compressed) >= len(data):
+            if variant in owned:
+                remove_variant(variant)
+            continue
+        write_if_changed(variant, compressed)
+        os.utime(variant, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        stats["compressed"] += 1
+        stats["bytes_saved"] += len(data) - len(compressed)
+        stats["variants"].append(variant)
+    return stats
+
+def find_compressible(dest_dir):
+    # Every file worth compressing, from one scandir walk
+    sources = []
+    stack = [dest_dir]
+    while stack:
+        folder = stack.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(COMPRESSIBLE_EXTENSIONS):
+                    sources.append(entry.path)
+    return sources
+
+def compress_tree(dest_dir, jobs=None, min_size=DEFAULT_MIN_SIZE, profiler=NULL_PROFILER, cache_path=DEFAULT_VARIANT_CACHE):
+    suffixes = tuple(available_codecs())
+    sources = find_compressible(dest_dir)
+    if not jobs or jobs < 1:
+        jobs = default_jobs()
+    totals = {"compressed": 0, "unchanged": 0, "small": 0, "bytes_saved": 0}
+    # A .gz shipped in static/ next to its source is not in the manifest and
+    # stays, whatever happens to the source
+    previous = load_manifest(cache_path, VARIANT_CACHE_VERSION)
+    owned = [
+        tuple(path + suffix for suffix in suffixes if os.path.relpath(path + suffix, dest_dir) in previous)
+        for path in sources
+    ]
+    if jobs == 1 or len(sources) < 2:
+        results = [compress_file(path, suffixes, min_size, variants) for path, variants in zip(sources, owned)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(sources))) as pool:
+            chunksize = max(1, len(sources) // (jobs * 4))
+            results = list(pool.map(compress_file, sources, [suffixes] * len(sources), [min_size] * len(sources), owned, chunksize=chunksize))
+    variants = {}
+    for stats in results:
+        for variant in stats.pop("variants"):
+            variants[os.path.relpath(variant, dest_dir)] = os.path.relpath(variant[:variant.rfind(".")], dest_dir)
+        for name, amount in stats.items():
+            totals[name] += amount
+    # Only variants this function wrote are removed once their source is gone,
+    # a .gz shipped in static/ is left alone
+    removed = 0
+    for variant in previous:
+        if variant not in variants and remove_variant(os.path.join(dest_dir, variant)):
+            removed += 1
+    save_manifest(cache_path, variants, VARIANT_CACHE_VERSION)
+    for name, amount in totals.items():
+        profiler.count(f"compress_{name}", amount)
+    print(
+        f"Compression ({', '.join(suffix[1:] for suffix in suffixes)}): {totals['compressed']} written, "
+        f"{totals['unchanged']} unchanged, {totals['small']} files too small, "
+        f"{removed} removed, {totals['bytes_saved']} bytes saved"
+    )
+    return totals
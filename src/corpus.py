@@ -0,0 +1,163 @@
+import argparse
+import os
+import random
+import struct
+import zlib
+
+WORDS = (
+    "the ring of power was forged in secret by the dark lord in the fires of mount doom "
+    "elves dwarves and men each received rings but one ring ruled them all hobbits lived "
+    "quietly in the shire until a wizard came knocking with news of an old and perilous road"
+).split()
+
+DEFAULT_TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+DEFAULT_SHAPE = {
+    "pages": 200,
+    "depth": 2,
+    "fanout": 10,
+    "blocks": 20,
+    "paragraph_words": 60,
+    "link_density": 0.02,
+    "image_density": 0.005,
+    "code_lines": 8,
+    "images": 10,
+    "seed": 0,
+}
+
+def png_bytes(width, height):
+    # Smallest valid PNG of the given size: 8-bit grayscale, all black
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\x00" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+def page_folders(pages, depth, fanout):
+    folders = []
+    for i in range(pages):
+        parts = []
+        n = i
+        for _ in range(depth):
+            parts.append(f"section-{n % fanout}")
+            n //= fanout
+        parts.append(f"page-{i}")
+        folders.append("/".join(parts))
+    return folders
+
+def synthetic_inline(rng, words, link_density=0.0, image_density=0.0, urls=(), images=()):
+    out = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        r = rng.random()
+        if r < link_density and urls:
+            out.append(f"[{word}]({rng.choice(urls)})")
+        elif r < link_density + image_density and images:
+            out.append(f"![{word}]({rng.choice(images)})")
+        elif r < 0.05:
+            out.append(f"**{word}**")
+        elif r < 0.08:
+            out.append(f"_{word}_")
+        elif r < 0.10:
+            out.append(f"`{word}`")
+        else:
+            out.append(word)
+    return " ".join(out)
+
+def synthetic_markdown(rng, title, blocks, paragraph_words=60, link_density=0.0, image_density=0.0, code_lines=8, urls=(), images=()):
+    parts = [f"# {title}"]
+    for i in range(blocks):
+        kind = rng.random()
+        if kind < 0.55:
+            parts.append(synthetic_inline(rng, paragraph_words, link_density, image_density, urls, images))
+        elif kind < 0.68:
+            items = rng.randint(2, 6)
+            parts.append("\n".join(f"- {synthetic_inline(rng, 8, link_density, 0, urls)}" for _ in range(items)))
+        elif kind < 0.78:
+            items = rng.randint(2, 6)
+            parts.append("\n".join(f"{n}. {synthetic_inline(rng, 8)}" for n in range(1, items + 1)))
+        elif kind < 0.86:
+            parts.append("\n".join(f"> {synthetic_inline(rng, 12)}" for _ in range(rng.randint(1, 3))))
+        elif kind < 0.94:
+            lines = [f"    value_{n} = compute({n}, **options)" for n in range(code_lines)]
+            parts.append("```\n" + "\n".join(lines) + "\n```")
+        else:
+            parts.append(f"{'#' * rng.randint(2, 4)} Section {i}")
+    return "\n\n".join(parts) + "\n"
+
+def generate_corpus(root, shape=None):
+    # Writes root/content, root/static and root/template.html, returns the shape and sizes
+    shape = {**DEFAULT_SHAPE, **(shape or {})}
+    rng = random.Random(shape["seed"])
+    content_dir = os.path.join(root, "content")
+    image_dir = os.path.join(root, "static", "images")
+    os.makedirs(image_dir, exist_ok=True)
+
+    images = []
+    for k in range(shape["images"]):
+        name = f"image-{k}.png"
+        with open(os.path.join(image_dir, name), "wb") as f:
+            f.write(png_bytes(16 * (k + 1), 9 * (k + 1)))
+        images.append(f"/images/{name}")
+    with open(os.path.join(root, "static", "index.css"), "w", encoding="utf-8") as f:
+        f.write("body {\n  margin: 0 auto;\n  max-width: 60em;\n}\n")
+    with open(os.path.join(root, "template.html"), "w", encoding="utf-8") as f:
+        f.write(DEFAULT_TEMPLATE)
+
+    folders = page_folders(shape["pages"], shape["depth"], shape["fanout"])
+    urls = ["/" + folder for folder in folders]
+    total_bytes = 0
+    for i, folder in enumerate(folders):
+        markdown = synthetic_markdown(
+            rng,
+            f"Page {i}",
+            shape["blocks"],
+            shape["paragraph_words"],
+            shape["link_density"],
+            shape["image_density"],
+            shape["code_lines"],
+            urls,
+            images,
+        )
+        page_dir = os.path.join(content_dir, *folder.split("/"))
+        os.makedirs(page_dir, exist_ok=True)
+        data = markdown.encode("utf-8")
+        with open(os.path.join(page_dir, "index.md"), "wb") as f:
+            f.write(data)
+        total_bytes += len(data)
+    return {"shape": shape, "pages": len(folders), "bytes": total_bytes}
+
+def add_shape_arguments(parser):
+    for name, default in DEFAULT_SHAPE.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+def shape_from_args(args):
+    return {name: getattr(args, name) for name in DEFAULT_SHAPE}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic site (content/, static/, template.html)")
+    parser.add_argument("root")
+    add_shape_arguments(parser)
+    args = parser.parse_args(argv)
+    summary = generate_corpus(args.root, shape_from_args(args))
+    print(f"Generated {summary['pages']} pages ({summary['bytes']} bytes of markdown) in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
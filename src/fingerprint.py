@@ -0,0 +1,85 @@
+from incremental import file_hash, load_manifest, save_manifest
+from output import write_if_changed
+from profiling import NULL_PROFILER
+from sync import scan_files
+import hashlib
+import json
+import os
+import shutil
+
+DEFAULT_HASH_CACHE = os.path.join(".cache", "asset-hashes.json")
+HASH_CACHE_VERSION = 1
+ASSET_MANIFEST = "asset-manifest.json"
+HASH_LENGTH = 10
+
+class AssetManifest():
+    # Root-relative asset url -> fingerprinted url, passed to the renderers as assets=
+    def __init__(self, urls):
+        self.urls = urls
+        # Part of the template and block cache keys, so a changed asset re-renders
+        self.digest = hashlib.sha256(json.dumps(urls, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def get(self, url, default=None):
+        return self.urls.get(url, default)
+
+def fingerprinted_name(name, digest):
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest[:HASH_LENGTH]}{extension}"
+
+def asset_url(rel_path):
+    return "/" + rel_path.replace(os.sep, "/")
+
+def fingerprint_assets(static_dir, dest_dir, variant="", cache_path=DEFAULT_HASH_CACHE, profiler=NULL_PROFILER):
+    # Hashes the assets as they were placed in dest_dir (minified or not, that
+    # is the variant) and puts a copy under the hashed name next to each one.
+    # A hash is reused while its static source keeps the same size and mtime.
+    old_hashes = load_manifest(cache_path, HASH_CACHE_VERSION)
+    hashes = {}
+    urls = {}
+    stats = {"hashed": 0, "cached": 0, "copied": 0, "removed": 0}
+    for rel_path, entry in scan_files(static_dir):
+        stat = entry.stat()
+        placed = os.path.join(dest_dir, rel_path)
+        previous = old_hashes.get(rel_path)
+        if (
+            previous
+            and previous["size"] == stat.st_size
+            and previous["mtime_ns"] == stat.st_mtime_ns
+            and previous["variant"] == variant
+        ):
+            digest = previous["hash"]
+            stats["cached"] += 1
+        else:
+            digest = file_hash(placed)
+            stats["hashed"] += 1
+        hashes[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "variant": variant, "hash": digest}
+        folder, name = os.path.split(rel_path)
+        hashed_rel = os.path.join(folder, fingerprinted_name(name, digest))
+        hashed_path = os.path.join(dest_dir, hashed_rel)
+        # Same name means same bytes, an existing copy is already right
+        if not os.path.exists(hashed_path):
+            shutil.copy2(placed, hashed_path)
+            stats["copied"] += 1
+        urls[asset_url(rel_path)] = asset_url(hashed_rel)
+
+    # Copies of older versions and of deleted assets
+    for rel_path, previous in old_hashes.items():
+        current = hashes.get(rel_path)
+        if current is None or current["hash"] != previous["hash"]:
+            folder, name = os.path.split(rel_path)
+            old_copy = os.path.join(dest_dir, folder, fingerprinted_name(name, previous["hash"]))
+            if os.path.exists(old_copy):
+                os.remove(old_copy)
+                stats["removed"] += 1
+
+    save_manifest(cache_path, hashes, HASH_CACHE_VERSION)
+    manifest = {url[1:]: hashed[1:] for url, hashed in sorted(urls.items())}
+    data = (json.dumps(manifest, indent=1) + "\n").encode("utf-8")
+    write_if_changed(os.path.join(dest_dir, ASSET_MANIFEST), data)
+    for name, amount in stats.items():
+        profiler.count(f"assets_{name}", amount)
+    print(
+        f"Fingerprint: {len(urls)} assets, {stats['hashed']} hashed, {stats['cached']} from cache, "
+        f"{stats['copied']} copied, {stats['removed']} removed"
+    )
+    return AssetManifest(urls)
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+# Shared by the tests, named so unittest discovery does not load it as a test module
+
+SAMPLE_TEMPLATE = "<title>{{ Title }}</title><link href=\"/index.css\">{{ Content }}"
+
+def write_file(path, data):
+    # Creates the parent folders, bytes are written as they are
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    if isinstance(data, bytes):
+        with open(path, "wb") as f:
+            f.write(data)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+def read_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def read_tree(root):
+    # Relative path -> bytes of every file under root
+    files = {}
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            with open(path, "rb") as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+def write_sample_site(content_dir, count):
+    # count pages spread over three sections, each with a link, bold text and a list
+    for i in range(count):
+        write_file(
+            os.path.join(content_dir, f"section{i % 3}", f"page{i}", "index.md"),
+            f"# Page {i}\n\nSome **bold** text and a [link](/section{i % 3})\n\n- one\n- two",
+        )
+
+class TempDirTestCase(unittest.TestCase):
+    # Every test gets its own temporary folder as self.root
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+
+    def write(self, path, data):
+        write_file(path, data)
+
+    def read(self, path):
+        return read_file(path)
+
+    def read_tree(self, root):
+        return read_tree(root)
@@ -0,0 +1,113 @@
+from datetime import datetime
+
+# Front matter is a block of "key: value" lines between two "---" lines at the
+# very top of a page, e.g. title, date, tags, draft and template
+FENCE = "---"
+# The header is read in chunks of this size, only as far as the closing fence
+HEADER_CHUNK = 1024
+MAX_HEADER_BYTES = 64 * 1024
+LIST_KEYS = ("tags",)
+BOOLEAN_KEYS = ("draft",)
+DATE_KEYS = ("date",)
+
+def find_title(lines):
+    # The text of the first "# " heading, None when there is none
+    for line in lines:
+        line = line[:-1] if line.endswith("\n") else line
+        if len(line) > 2 and line[0] == "#" and line[1] == " ":
+            return line[2:]
+    return None
+
+def unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+def parse_value(key, value):
+    value = value.strip()
+    if key in LIST_KEYS:
+        # Both "[a, b]" and "a, b"
+        if value.startswith("[") and value.endswith("]"):
+            value = value[1:-1]
+        return [unquote(item.strip()) for item in value.split(",") if item.strip()]
+    value = unquote(value)
+    if key in BOOLEAN_KEYS:
+        if value.lower() in ("true", "yes"):
+            return True
+        if value.lower() in ("false", "no", ""):
+            return False
+        raise Exception(f"Front matter {key} has to be true or false, not {value}")
+    if key in DATE_KEYS:
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise Exception(f"Front matter {key} has to be an ISO date, not {value}")
+    return value
+
+def parse_front_matter(lines):
+    # (metadata, number of lines it takes up including both fences), a page
+    # without a closing fence has no front matter and gives ({}, 0)
+    if not lines or lines[0].rstrip() != FENCE:
+        return {}, 0
+    # The closing fence is found first, so a page that opens with a thematic
+    # break followed by text is left alone
+    for count, line in enumerate(lines[1:], 2):
+        if line.rstrip() == FENCE:
+            break
+    else:
+        return {}, 0
+    meta = {}
+    for number, line in enumerate(lines[1:count - 1], 2):
+        line = line.rstrip()
+        if not line or line.lstrip().startswith("#"):
+            continue
+        key, separator, value = line.partition(":")
+        if not separator:
+            raise Exception(f"Front matter line {number} is not key: value: {line}")
+        key = key.strip().lower()
+        meta[key] = parse_value(key, value)
+    return meta, count
+
+def split_front_matter(md_content):
+    # The front matter lines become blank lines, so the line numbers of the
+    # body stay those of the file
+    if not md_content.startswith(FENCE):
+        return {}, md_content
+    meta, count = parse_front_matter(md_content.split("\n"))
+    return meta, blank_lines(md_content, count)
+
+def blank_lines(md_content, count):
+    # The same with the line count already known, e.g. from the page index
+    if not count:
+        return md_content
+    lines = md_content.split("\n", count)
+    return "\n" * count + (lines[count] if len(lines) > count else "")
+
+def blank_header(lines, count):
+    # The same for a file read line by line, count comes from read_page_header
+    for number, line in enumerate(lines):
+        yield "\n" if number < count else line
+
+def read_page_header(path):
+    # (metadata, front matter line count) from the top of the file alone. The
+    # title falls back to the first heading when it is within the bytes read
+    data = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HEADER_CHUNK)
+            data += chunk
+            lines = data.split(b"\n")
+            if chunk:
+                # The last line may go on in the next chunk
+                lines.pop()
+            lines = [line.decode("utf-8") for line in lines]
+            meta, count = parse_front_matter(lines)
+            # Until the first line is complete it may still turn out to be a fence
+            opened = not lines or lines[0].rstrip() == FENCE
+            if count or not opened or not chunk or len(data) >= MAX_HEADER_BYTES:
+                break
+    if "title" not in meta:
+        title = find_title(lines[count:])
+        if title is not None:
+            meta["title"] = title
+    return meta, count
@@ -1,8 +1,23 @@
 from htmlnode import ParentNode, LeafNode
 from textnode import TextType, BlockType, TextNode
+from template import load_template
+from output import (
+    ensure_dir,
+    forget_dirs,
+    prepare_output_dirs,
+    remember_dir,
+    replace_if_changed,
+    temp_file,
+    write_if_changed,
+)
+from front_matter import blank_header, blank_lines, find_title, read_page_header, split_front_matter
+from page_index import scan_pages
+from profiling import NULL_PROFILER
+import io
 import re
 import os
 import shutil
+import time
 
 def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.TEXT:
@@ -83,24 +98,79 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
+IMAGE_PATTERN = re.compile(r'!\[([^\]]+)\]\(([^)]+)\)')
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+WORD_PATTERN = re.compile(r"\w+")
+
 def extract_markdown_images(text):
-    pattern = r'!\[([^\]]+)\]\(([^)]+)\)'
-    matches = re.findall(pattern, text)
+    matches = IMAGE_PATTERN.findall(text)
     return matches
 
 def extract_markdown_links(text):
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, text)
+    matches = LINK_PATTERN.findall(text)
     return matches
 
+# text_to_textnodes tokenizes in one pass straight into a single list. It keeps
+# the exact output of chaining split_nodes_delimiter ("**", "_", "`"),
+# split_nodes_image and split_nodes_link, but walks the text with offsets
+# instead of rebuilding the node list and re-splitting the remaining text on
+# every match.
 def text_to_textnodes(text):
-    main_node =  TextNode(text, TextType.TEXT)
-    bold_split = split_nodes_delimiter([main_node], "**", TextType.BOLD)
-    italic_split = split_nodes_delimiter(bold_split, "_", TextType.ITALIC)
-    code_split = split_nodes_delimiter(italic_split, "`", TextType.CODE)
-    image_split = split_nodes_image(code_split)
-    link_split = split_nodes_link(image_split)
-    return link_split
+    nodes = []
+    bold_parts = text.split("**")
+    if len(bold_parts) % 2 == 0:
+        raise Exception("Invalid markdown")
+    for i, bold_part in enumerate(bold_parts):
+        if not bold_part:
+            continue
+        if i % 2:
+            nodes.append(TextNode(bold_part, TextType.BOLD))
+            continue
+        italic_parts = bold_part.split("_")
+        if len(italic_parts) % 2 == 0:
+            raise Exception("Invalid markdown")
+        for j, italic_part in enumerate(italic_parts):
+            if not italic_part:
+                continue
+            if j % 2:
+                nodes.append(TextNode(italic_part, TextType.ITALIC))
+                continue
+            code_parts = italic_part.split("`")
+            if len(code_parts) % 2 == 0:
+                raise Exception("Invalid markdown")
+            for k, code_part in enumerate(code_parts):
+                if not code_part:
+                    continue
+                if k % 2:
+                    nodes.append(TextNode(code_part, TextType.CODE))
+                else:
+                    append_images(nodes, code_part)
+    return nodes
+
+def append_images(nodes, text):
+    pos = 0
+    for match in IMAGE_PATTERN.finditer(text):
+        markdown = match.group(0)
+        start = text.find(markdown, pos)
+        if text[pos:start].strip(): # Do not append empty strings
+            append_links(nodes, text[pos:start])
+        nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))
+        pos = start + len(markdown)
+    if pos < len(text):
+        append_links(nodes, text[pos:])
+
+def append_links(nodes, text):
+    pos = 0
+    for match in LINK_PATTERN.finditer(text):
+        markdown = match.group(0)
+        # Same first occurrence split_nodes_link would split on
+        start = text.find(markdown, pos)
+        if text[pos:start].strip(): # Do not append empty strings
+            nodes.append(TextNode(text[pos:start], TextType.TEXT))
+        nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))
+        pos = start + len(markdown)
+    if pos < len(text):
+        nodes.append(TextNode(text[pos:], TextType.TEXT))
 
 def markdown_to_blocks(markdown):
     blocks = markdown.split("\n\n")
@@ -155,111 +225,384 @@ def strip_markers(block, block_type):
     if block_type == BlockType.PARAGRAPH:
         return block.replace("\n", " ")
 
-def text_to_children(text):
-    childrens = []
-    text_nodes = text_to_textnodes(text)
-    for text_node in text_nodes:
-        childrens.append(text_node_to_html_node(text_node))
-    return childrens
-
-def text_to_list_children(text):
-    childrens = []
-    text_nodes = []
-    for item in text.split("\n"):
-        text_nodes.extend(text_to_textnodes(item))
-    for text_node in text_nodes:
-        children = text_node_to_html_node(text_node)
-        parent = ParentNode("li", [children])
-        childrens.append(parent)
-    return childrens
-
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+# scan_blocks reads markdown line by line and yields (block_type, block,
+# block_text) as each block ends. It gives the same result as
+# markdown_to_blocks, block_to_block_type and strip_markers, without regexes or
+# re-splitting, except that a fenced code block keeps its blank lines instead of
+# being cut in two. With references, the line each block starts on is set on it
+# before the block is yielded.
+def scan_blocks(lines, references=None):
+    block = []
+    started = False
+    fenced = False
+    for number, line in enumerate(lines, 1):
+        if line.endswith("\n"):
+            line = line[:-1]
+        if fenced:
+            block.append(line)
+            if "```" in line:
+                fenced = False
+            continue
+        if not line:
+            if started:
+                if references is not None:
+                    references.line = start
+                yield classify_block("\n".join(block).strip())
+            block = []
+            started = False
+            continue
+        block.append(line)
+        if not started:
+            stripped = line.lstrip()
+            if stripped:
+                started = True
+                start = number
+                fenced = stripped.startswith("```") and "```" not in stripped[3:]
+    if started:
+        if references is not None:
+            references.line = start
+        yield classify_block("\n".join(block).strip())
+
+def ordered_prefix_length(line):
+    # Length of a leading "12. " marker, 0 when there is none
+    i = 0
+    while i < len(line) and line[i].isdecimal():
+        i += 1
+    if 0 < i < len(line) - 1 and line[i] == "." and line[i + 1].isspace():
+        return i + 2
+    return 0
+
+def classify_block(block):
+    first = block[0]
+    if first == "#":
+        count = len(block) - len(block.lstrip("#"))
+        if count <= 6 and count < len(block) and block[count].isspace():
+            return BlockType.HEADING, block, block[count + 1:]
+    if first == "`" and block.startswith("```") and block.find("```", 3) != -1:
+        lines = block.split("\n")
+        if len(lines) > 2:
+            if lines[0] == "```":
+                del lines[0]
+            if lines[-1] == "```":
+                del lines[-1]
+        return BlockType.CODE, block, "\n".join(lines)
+    if first == ">":
+        lines = []
+        for line in block.split("\n"):
+            if line:
+                if line[0] == ">":
+                    line = line[2:] if len(line) > 1 and line[1].isspace() else line[1:]
+                lines.append(line)
+        return BlockType.QUOTE, block, "\n".join(lines)
+    if first == "-" and len(block) > 1 and block[1].isspace():
+        lines = []
+        for line in block.split("\n"):
+            if line:
+                if line[0] == "-" and len(line) > 1 and line[1].isspace():
+                    line = line[2:]
+                lines.append(line)
+        return BlockType.UL, block, "\n".join(lines)
+
+    previous = None
+    ordered = False
+    for line in block.splitlines():
+        prefix = ordered_prefix_length(line)
+        if prefix:
+            number = int(line[:prefix - 2])
+            if previous is not None and number != previous + 1:
+                ordered = False
+                break
+            previous = number
+            ordered = True
+    if ordered:
+        lines = [line[ordered_prefix_length(line):] for line in block.split("\n") if line]
+        return BlockType.OL, block, "\n".join(lines)
+    return BlockType.PARAGRAPH, block, block.replace("\n", " ")
+
+def typed_block_to_html_node(block_type, block, block_text, words=None, references=None):
+    text_nodes = block_to_textnodes(block_type, block_text)
+    if words is not None:
+        text_words(text_nodes, words)
+    if references is not None:
+        references.add(text_nodes)
+    return text_nodes_to_block_node(block_type, block, text_nodes)
+
+def text_words(text_nodes, words):
+    # Appends the lowercase words of the text nodes, for the search index
+    for node in text_nodes:
+        words.extend(match.group(0).casefold() for match in WORD_PATTERN.finditer(node.text))
+
+class PageReferences():
+    # [url, line number] of every link and image the parser turns into a node,
+    # so code spans and code blocks are left out. Each is numbered with the line
+    # its block starts on, counting from 1 at the top of the file
+    def __init__(self):
+        self.links = []
+        self.images = []
+        self.line = 0
+
+    def add(self, text_nodes):
+        for node in text_nodes:
+            if node.text_type == TextType.LINK:
+                self.links.append([node.url, self.line])
+            elif node.text_type == TextType.IMAGE:
+                self.images.append([node.url, self.line])
+
+def block_to_textnodes(block_type, block_text):
+    if block_type == BlockType.CODE:
+        return [TextNode(block_text, TextType.CODE)]
+    if block_type == BlockType.UL or block_type == BlockType.OL:
+        text_nodes = []
+        for item in block_text.split("\n"):
+            text_nodes.extend(text_to_textnodes(item))
+        return text_nodes
+    return text_to_textnodes(block_text)
+
+def text_nodes_to_block_node(block_type, block, text_nodes):
+    children = [text_node_to_html_node(text_node) for text_node in text_nodes]
+    if block_type == BlockType.PARAGRAPH:
+        node = ParentNode("p", children)
+    elif block_type == BlockType.QUOTE:
+        node = ParentNode("blockquote", children)
+    elif block_type == BlockType.CODE:
+        node = ParentNode("pre", children)
+    elif block_type == BlockType.HEADING:
+        c = 0
+        while block[c] == "#":
+            c += 1
+        node = ParentNode(f"h{c}", children)
+    elif block_type == BlockType.UL:
+        node = ParentNode("ul", [ParentNode("li", [child]) for child in children])
+    elif block_type == BlockType.OL:
+        node = ParentNode("ol", [ParentNode("li", [child]) for child in children])
+    return node
+
+def markdown_to_html_node(markdown, words=None, references=None):
     all_nodes = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        block_text = strip_markers(block, block_type)
-        if block_type == BlockType.PARAGRAPH:
-            children = text_to_children(block_text)
-            node = ParentNode("p", children)
-        elif block_type == BlockType.QUOTE:
-            children = text_to_children(block_text)
-            node = ParentNode("blockquote", children)
-        elif block_type == BlockType.CODE:
-            code_text_node = TextNode(block_text, TextType.CODE)
-            code_node = text_node_to_html_node(code_text_node)
-            node = ParentNode("pre", [code_node])
-        elif block_type == BlockType.HEADING:
-            c = 0
-            children = text_to_children(block_text)
-            while block[c] == "#":
-                c += 1
-            node = ParentNode(f"h{c}", children)
-        elif block_type == BlockType.UL:
-            children = text_to_list_children(block_text)
-            node = ParentNode(f"ul", children)
-        elif block_type == BlockType.OL:
-            children = text_to_list_children(block_text)
-            node = ParentNode(f"ol", children)
-        all_nodes.append(node)
+    for block_type, block, block_text in scan_blocks(markdown.split("\n"), references):
+        all_nodes.append(typed_block_to_html_node(block_type, block, block_text, words, references))
     return ParentNode("div", all_nodes)
 
+def block_salt(basepath, assets=None, image_sizes=None):
+    # Everything besides its text that a rendered block depends on
+    salt = basepath
+    for option in (assets, image_sizes):
+        if option is not None:
+            salt += f"\0{option.digest}"
+    return salt
+
+def iter_markdown_html(blocks, basepath, cache=None, assets=None, image_sizes=None, words=None, references=None):
+    yield "<div>"
+    salt = block_salt(basepath, assets, image_sizes)
+    for block_type, block, block_text in blocks:
+        if cache is None:
+            node = typed_block_to_html_node(block_type, block, block_text, words, references)
+            yield from rebase_urls(node, basepath, assets, image_sizes).iter_html()
+            continue
+        key = cache.key(block, salt)
+        html = cache.get(key)
+        if html is None:
+            node = typed_block_to_html_node(block_type, block, block_text, words, references)
+            html = rebase_urls(node, basepath, assets, image_sizes).to_html()
+            cache.put(key, html)
+        elif words is not None or references is not None:
+            # A cached block still has its words and urls taken, from its text nodes alone
+            text_nodes = block_to_textnodes(block_type, block_text)
+            if words is not None:
+                text_words(text_nodes, words)
+            if references is not None:
+                references.add(text_nodes)
+        yield html
+    yield "</div>"
+
 def copy_files(src, dest):
     if os.path.exists(dest):
         shutil.rmtree(dest)
+    forget_dirs(os.path.normpath(dest))
     os.mkdir(dest)
+    remember_dir(os.path.normpath(dest))
     recursive_copy(src, dest)
 
 def recursive_copy(src, dest):
-    for item in os.listdir(src):   
-        file_path_source = os.path.join(src, item)
-        file_path_destination = os.path.join(dest, item)
-        if os.path.isfile(file_path_source):
-            shutil.copy(file_path_source, file_path_destination)
-        else:
-            os.mkdir(file_path_destination)
-            recursive_copy(file_path_source, file_path_destination)
+    with os.scandir(src) as entries:
+        for entry in entries:
+            file_path_destination = os.path.join(dest, entry.name)
+            if entry.is_dir():
+                os.mkdir(file_path_destination)
+                remember_dir(os.path.normpath(file_path_destination))
+                recursive_copy(entry.path, file_path_destination)
+            else:
+                shutil.copy(entry.path, file_path_destination)
 
 def extract_title(markdown):
-    for line in markdown.split("\n"):
-        if len(line) > 2 and line[0] == "#" and line[1] == " ":
-            return line[2:]
-    raise Exception("Markdown has to have a title")
+    lines = markdown.split("\n") if isinstance(markdown, str) else markdown
+    title = find_title(lines)
+    if title is None:
+        raise Exception("Markdown has to have a title")
+    return title
+
+def page_template(template_path, meta):
+    # A page may name its own template, next to the default one
+    if meta.get("template"):
+        return os.path.join(os.path.dirname(template_path), meta["template"])
+    return template_path
+
+def rebase_urls(node, basepath, assets=None, image_sizes=None):
+    # Points root-relative link and image urls at the basepath, and at the
+    # fingerprinted copy when the url is a known asset. With image_sizes, img tags
+    # also get their size and lazy loading, looked up before the src changes
+    if basepath == "/" and assets is None and image_sizes is None:
+        return node
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        stack.extend(current.children)
+        if image_sizes is not None and current.tag == "img":
+            image_sizes.add_attributes(current.props)
+        for key in ("href", "src"):
+            url = current.props.get(key)
+            if url and url.startswith("/"):
+                if assets is not None:
+                    url = assets.get(url, url)
+                current.props[key] = basepath + url[1:]
+    return node
 
-def generate_page(from_path, template_path, dest_path, basepath):
+def extract_title_from_file(path, header_lines=0):
+    with open(path, "r", encoding="utf-8") as md_file:
+        return extract_title(blank_header(md_file, header_lines))
+
+def read_markdown(from_path, profiler=NULL_PROFILER):
+    with profiler.stage("read", from_path):
+        with open(from_path, "r", encoding="utf-8") as md_file:
+            md_content = md_file.read()
+            profiler.count("bytes_read", os.fstat(md_file.fileno()).st_size)
+    return md_content
+
+def split_page(md_content, header=None):
+    # (front matter with the title filled in, body with the front matter lines
+    # blank). header is the (front matter, line count) pair the page index
+    # read, so the front matter is not parsed again
+    if header is None:
+        meta, md_content = split_front_matter(md_content)
+    else:
+        meta, header_lines = header
+        md_content = blank_lines(md_content, header_lines)
+    if not meta.get("title"):
+        meta = dict(meta, title=extract_title(md_content))
+    return meta, md_content
+
+def render_markdown_page(md_content, template_path, basepath, profiler=NULL_PROFILER, cache=None, page=None, minify=None, assets=None, image_sizes=None, words=None, references=None, meta=None):
+    # With a words list, the words of the page are appended to it as it is
+    # parsed, and with references its link and image urls. Given its meta,
+    # md_content is the body split_page returned with it
+    if meta is None:
+        meta, md_content = split_front_matter(md_content)
+    if cache is None:
+        with profiler.stage("parse", page):
+            html_node = rebase_urls(markdown_to_html_node(md_content, words, references), basepath, assets, image_sizes)
+        with profiler.stage("serialize", page):
+            html_content = html_node.to_html()
+    else:
+        # Cached blocks skip parsing and serializing alike
+        with profiler.stage("render", page):
+            blocks = scan_blocks(md_content.split("\n"), references)
+            html_content = "".join(iter_markdown_html(blocks, basepath, cache, assets, image_sizes, words, references))
+    with profiler.stage("template", page):
+        template = load_template(page_template(template_path, meta), basepath, assets)
+        html_full_page = template.render({
+            "Title": meta.get("title") or extract_title(md_content),
+            "Content": html_content,
+        })
+    if minify is not None:
+        with profiler.stage("minify", page):
+            html_full_page = minify.html(html_full_page, page)
+    return html_full_page
+
+def count_write(profiler, written):
+    if written:
+        profiler.count("bytes_written", written)
+        profiler.count("pages_written")
+    else:
+        profiler.count("pages_unchanged")
+
+def write_page(dest_path, html_full_page, profiler=NULL_PROFILER, page=None):
+    with profiler.stage("write", page):
+        data = html_full_page.encode("utf-8")
+        ensure_dir(os.path.dirname(dest_path), profiler)
+        count_write(profiler, write_if_changed(dest_path, data))
+
+def generate_page(from_path, template_path, dest_path, basepath, profiler=NULL_PROFILER, cache=None, site=None, minify=None, assets=None, image_sizes=None, search=None, header=None):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    with open(from_path, "r", encoding="utf-8") as md_file:
-        md_content = md_file.read()
-
-    with open(template_path, "r", encoding="utf-8") as html_file:
-        html_page = html_file.read()
-
-    html_content = markdown_to_html_node(md_content).to_html()
-    title = extract_title(md_content)
-    html_full_page = (
-        html_page
-        .replace("{{ Title }}", title)
-        .replace("{{ Content }}", html_content)
-    )       
-    html_full_page = (
-        html_full_page
-        .replace('href="/', f'href="{basepath}')
-        .replace('src="/', f'src="{basepath}')
-    ) 
-    
-    folder, filename = os.path.split(dest_path)
-    os.makedirs(folder, exist_ok=True)
-    with open(dest_path, "w", encoding="utf-8") as f:
-        f.write(html_full_page)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    dir_list = os.listdir(dir_path_content)
-    for dir in dir_list:
-        src = os.path.join(dir_path_content, dir)
-        dest = os.path.join(dest_dir_path, dir)
-        if os.path.isfile(src):
-            folder, filename = os.path.split(dest)
-            dest = os.path.join(folder, filename.replace(".md", ".html"))
-            generate_page(src, template_path, dest, basepath)
-        else:
-            generate_pages_recursive(src, template_path, dest, basepath)
\ No newline at end of file
+    start = time.perf_counter()
+    meta, md_content = split_page(read_markdown(from_path, profiler), header)
+    words = [] if search is not None else None
+    references = PageReferences() if site is not None else None
+    html_full_page = render_markdown_page(md_content, template_path, basepath, profiler, cache, from_path, minify, assets, image_sizes, words, references, meta)
+    write_page(dest_path, html_full_page, profiler, from_path)
+    if site is not None:
+        site.add_page(from_path, dest_path, references, meta["title"], meta.get("date"))
+    if search is not None:
+        search.add_page(from_path, dest_path, words, meta["title"])
+    profiler.page(from_path, time.perf_counter() - start)
+
+def generate_page_streaming(from_path, template_path, dest_path, basepath, profiler=NULL_PROFILER, cache=None, site=None, minify=None, assets=None, image_sizes=None, search=None, header=None):
+    # Renders block by block from the open markdown file into the open output
+    # file, so only one block and its html are held in memory at a time
+    print(f"Streaming page from {from_path} to {dest_path} using {template_path}")
+    start = time.perf_counter()
+    with profiler.stage("read", from_path):
+        meta, header_lines = header if header is not None else read_page_header(from_path)
+        title = meta.get("title") or extract_title_from_file(from_path, header_lines)
+    with profiler.stage("template", from_path):
+        template = load_template(page_template(template_path, meta), basepath, assets)
+
+    # Reading, parsing, serializing and writing are interleaved block by block
+    words = [] if search is not None else None
+    references = PageReferences() if site is not None else None
+    with profiler.stage("stream", from_path):
+        ensure_dir(os.path.dirname(dest_path), profiler)
+        out, tmp_path = temp_file(dest_path)
+        try:
+            with open(from_path, "r", encoding="utf-8") as md_file, io.TextIOWrapper(out, encoding="utf-8") as f:
+                lines = blank_header(md_file, header_lines)
+                content = iter_markdown_html(scan_blocks(lines, references), basepath, cache, assets, image_sizes, words, references)
+                if minify is None:
+                    template.stream(f, {"Title": title, "Content": content})
+                else:
+                    writer = minify.writer(f, from_path)
+                    template.stream(writer, {"Title": title, "Content": content})
+                    writer.finish()
+                profiler.count("bytes_read", os.fstat(md_file.fileno()).st_size)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        count_write(profiler, replace_if_changed(tmp_path, dest_path))
+    if site is not None:
+        site.add_page(from_path, dest_path, references, title, meta.get("date"))
+    if search is not None:
+        search.add_page(from_path, dest_path, words, title)
+    profiler.page(from_path, time.perf_counter() - start)
+
+def find_page_index(dir_path_content, dest_dir_path):
+    # Drafts are left out of every build, the pages keep the front matter read
+    # here for the renderers
+    return scan_pages(dir_path_content, dest_dir_path).load_meta().published()
+
+def find_pages(dir_path_content, dest_dir_path):
+    return find_page_index(dir_path_content, dest_dir_path).pairs()
+
+def plan_pages(pages, page_options):
+    # The search index numbers the pages before any of them is rendered
+    search = page_options.get("search")
+    if search is not None:
+        search.plan(pages)
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, render=generate_page, profiler=NULL_PROFILER, **page_options):
+    with profiler.stage("discover"):
+        index = find_page_index(dir_path_content, dest_dir_path)
+    pages = index.pairs()
+    headers = index.headers()
+    plan_pages(pages, page_options)
+    prepare_output_dirs(pages, profiler)
+    for src, dest in pages:
+        render(src, template_path, dest, basepath, profiler=profiler, header=headers[src], **page_options)
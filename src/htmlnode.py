@@ -1,12 +1,24 @@
+from types import MappingProxyType
+
+# Shared by every node created without children or props, read-only so one
+# node cannot change another through them
+EMPTY_CHILDREN = ()
+EMPTY_PROPS = MappingProxyType({})
+
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag: str = None, value: str = None, children: list = None, props: dict = None):
         self.tag = tag
         self.value = value 
-        self.children = children if children is not None else []
-        self.props = props if props is not None else {}
+        self.children = children if children is not None else EMPTY_CHILDREN
+        self.props = props if props is not None else EMPTY_PROPS
 
     def to_html(self):
         raise NotImplementedError
+
+    def iter_html(self):
+        yield self.to_html()
     
     def props_to_html(self):
         if not self.props:
@@ -22,6 +34,8 @@ class HTMLNode():
         )
     
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, value: str, props: dict = None):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
@@ -34,19 +48,29 @@ class LeafNode(HTMLNode):
     
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props = None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
     def to_html(self):
-        if not self.tag:
-            raise ValueError(f"{self.__repr__()}\nMissing tag")
-        if not self.children:
-            raise ValueError(f"{self.__repr__()}\nMissing children")
-        s = f"<{self.tag}{self.props_to_html()}></{self.tag}>"
-        temp_s = ""
-        for child in self.children:
-            temp_s += child.to_html()
-        return s.replace("><", f">{temp_s}<")
-            
-
+        return "".join(self.iter_html())
 
+    def iter_html(self):
+        # Walks the tree with an explicit stack so every tag and leaf is produced
+        # exactly once, whatever the depth of the tree
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                yield node
+            elif isinstance(node, ParentNode):
+                if not node.tag:
+                    raise ValueError(f"{node.__repr__()}\nMissing tag")
+                if not node.children:
+                    raise ValueError(f"{node.__repr__()}\nMissing children")
+                yield f"<{node.tag}{node.props_to_html()}>"
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                yield node.to_html()
@@ -0,0 +1,133 @@
+from incremental import load_manifest, save_manifest
+from profiling import NULL_PROFILER
+from sync import scan_files
+import hashlib
+import json
+import os
+import struct
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+DEFAULT_SIZE_CACHE = os.path.join(".cache", "image-sizes.json")
+SIZE_CACHE_VERSION = 1
+# Every JPEG start-of-frame marker, they all carry the size the same way
+JPEG_FRAME_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+def png_size(header):
+    if header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+def gif_size(header):
+    return struct.unpack("<HH", header[6:10])
+
+def webp_size(header):
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and header[20] == 0x2F:
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+    return None
+
+def jpeg_size(f):
+    # Skips from segment to segment by their lengths until a frame header,
+    # the compressed image data after it is never read
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9:
+            return None
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        length = struct.unpack(">H", length)[0]
+        if marker in JPEG_FRAME_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def image_size(path):
+    # (width, height) from the first bytes of the file, None when unknown
+    with open(path, "rb") as f:
+        header = f.read(30)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and len(header) >= 24:
+            return png_size(header)
+        if header[:6] in (b"GIF87a", b"GIF89a") and len(header) >= 10:
+            return gif_size(header)
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP" and len(header) >= 30:
+            return webp_size(header)
+        if header.startswith(b"\xff\xd8"):
+            return jpeg_size(f)
+    return None
+
+class ImageSizes():
+    # Root-relative image url -> [width, height], passed to the renderers as image_sizes=
+    def __init__(self, sizes):
+        self.sizes = sizes
+        # Part of the block cache key, so a resized image re-renders its blocks
+        self.digest = hashlib.sha256(json.dumps(sizes, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def get(self, url):
+        return self.sizes.get(url)
+
+    def add_attributes(self, props):
+        size = self.sizes.get(props.get("src"))
+        if size is not None:
+            props["width"] = str(size[0])
+            props["height"] = str(size[1])
+        props["loading"] = "lazy"
+        props["decoding"] = "async"
+
+def scan_image_sizes(static_dir, cache_path=DEFAULT_SIZE_CACHE, profiler=NULL_PROFILER):
+    # Reads the header of every image in static_dir whose size or mtime
+    # changed since the last build, the others come from the cache
+    old_sizes = load_manifest(cache_path, SIZE_CACHE_VERSION)
+    entries = {}
+    sizes = {}
+    stats = {"read": 0, "cached": 0, "unknown": 0}
+    for rel_path, entry in scan_files(static_dir):
+        if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        stat = entry.stat()
+        previous = old_sizes.get(rel_path)
+        if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+            dimensions = previous["dimensions"]
+            stats["cached"] += 1
+        else:
+            dimensions = image_size(entry.path)
+            dimensions = list(dimensions) if dimensions is not None else None
+            stats["read"] += 1
+        entries[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "dimensions": dimensions}
+        if dimensions is None:
+            print(f"Unknown image format: {entry.path}")
+            stats["unknown"] += 1
+        else:
+            sizes["/" + rel_path.replace(os.sep, "/")] = dimensions
+    save_manifest(cache_path, entries, SIZE_CACHE_VERSION)
+    for name, amount in stats.items():
+        profiler.count(f"images_{name}", amount)
+    print(
+        f"Image sizes: {len(entries)} images, {stats['read']} read, "
+        f"{stats['cached']} from cache, {stats['unknown']} unknown"
+    )
+    return ImageSizes(sizes)
@@ -0,0 +1,151 @@
+from functions import generate_page, page_template
+from page_index import scan_pages
+from parallel import render_pages, raise_for_failures
+from output import prepare_output_dirs
+from profiling import NULL_PROFILER
+import hashlib
+import json
+import os
+
+# Every cache written with save_manifest has its own version, bumped only
+# when that cache's entries change shape
+MANIFEST_VERSION = 2
+DEFAULT_MANIFEST = os.path.join(".cache", "build-manifest.json")
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(path, version):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != version:
+        return {}
+    return manifest.get("outputs", {})
+
+def save_manifest(path, outputs, version):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "outputs": outputs}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def source_entry(page, previous):
+    # Size and mtime unchanged since the last build: trust the stored hash
+    if (
+        previous
+        and previous.get("source") == page.src
+        and previous.get("size") == page.size
+        and previous.get("mtime_ns") == page.mtime_ns
+    ):
+        source_hash = previous["source_hash"]
+    else:
+        source_hash = file_hash(page.src)
+    return {
+        "source": page.src,
+        "source_hash": source_hash,
+        "size": page.size,
+        "mtime_ns": page.mtime_ns,
+    }
+
+def is_stale(previous, entry, dest):
+    if previous is None or not os.path.exists(dest):
+        return True
+    for key in ("source", "source_hash", "template_hash", "basepath", "minify", "assets", "image_sizes"):
+        if previous.get(key) != entry[key]:
+            return True
+    return False
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath, manifest_path=DEFAULT_MANIFEST, jobs=1, render=generate_page, profiler=NULL_PROFILER, **page_options):
+    # Collectors whose entry for each page is kept in the manifest and replayed
+    # for the pages that are not rendered again
+    collectors = {name: page_options[name] for name in ("site",) if name in page_options}
+    # The search index instead copies unchanged pages out of the index the
+    # last build wrote, the manifest only notes which pages went into it
+    search = page_options.get("search")
+    reused = []
+    assets = page_options.get("assets")
+    image_sizes = page_options.get("image_sizes")
+    outputs = {}
+    stale = []
+    stats = {"rendered": 0, "unchanged": 0, "removed": 0}
+
+    with profiler.stage("discover"):
+        old_outputs = load_manifest(manifest_path, MANIFEST_VERSION)
+        template_hashes = {}
+        # The page index already carries each source's size and mtime, and its
+        # front matter is cached next to the manifest
+        index = scan_pages(dir_path_content, dest_dir_path)
+        index.load_meta(os.path.join(os.path.dirname(manifest_path), "page-meta.json"))
+        published = index.published()
+        if search is not None:
+            search.plan(published.pairs())
+            indexed = search.reusable()
+        for page in published:
+            previous = old_outputs.get(page.dest)
+            entry = source_entry(page, previous)
+            page_template_path = page_template(template_path, page.meta)
+            if page_template_path not in template_hashes:
+                template_hashes[page_template_path] = file_hash(page_template_path)
+            entry["template_hash"] = template_hashes[page_template_path]
+            entry["basepath"] = basepath
+            entry["minify"] = "minify" in page_options
+            # A changed asset changes the fingerprinted urls in every page
+            entry["assets"] = assets.digest if assets is not None else None
+            entry["image_sizes"] = image_sizes.digest if image_sizes is not None else None
+            # Pages rendered before a collector was on have nothing to replay
+            if (
+                is_stale(previous, entry, page.dest)
+                or any(name not in previous for name in collectors)
+                or (search is not None and not (previous.get("search") and page.src in indexed))
+            ):
+                stale.append((page.src, page.dest))
+            else:
+                stats["unchanged"] += 1
+                for name, collector in collectors.items():
+                    collector.add_entry(page.src, previous[name])
+                    # Kept for the build after this one too
+                    entry[name] = previous[name]
+                if search is not None:
+                    reused.append(page.src)
+                    entry["search"] = True
+            outputs[page.dest] = entry
+        if search is not None:
+            search.reuse(reused)
+
+    prepare_output_dirs(stale, profiler)
+    failures = render_pages(stale, template_path, basepath, jobs, render, profiler, published.headers(), **page_options)
+    stats["rendered"] = len(stale) - len(failures)
+    # Failed pages stay out of the manifest so the next build retries them
+    failed_sources = {src for src, _ in failures}
+    failed_dests = {dest for src, dest in stale if src in failed_sources}
+    for dest in failed_dests:
+        del outputs[dest]
+    for src, dest in stale:
+        if dest in outputs:
+            for name, collector in collectors.items():
+                outputs[dest][name] = collector.pages[src]
+            if search is not None:
+                outputs[dest]["search"] = True
+
+    for dest in old_outputs:
+        if dest not in outputs and dest not in failed_dests and os.path.exists(dest):
+            print(f"Removing {dest}, its source is gone")
+            os.remove(dest)
+            stats["removed"] += 1
+
+    save_manifest(manifest_path, outputs, MANIFEST_VERSION)
+    print(
+        f"Incremental build: {stats['rendered']} rendered, "
+        f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+    )
+    raise_for_failures(failures)
+    return stats
@@ -0,0 +1,79 @@
+from page_index import page_url
+from profiling import NULL_PROFILER
+from urllib.parse import unquote, urlsplit
+import os
+import posixpath
+
+def static_targets(static_dir, url="/"):
+    # Root-relative url of every static file, from one scandir walk. url is
+    # where the folder ends up in the site
+    targets = set()
+    stack = [(static_dir, url)]
+    while stack:
+        folder, url = stack.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append((entry.path, f"{url}{entry.name}/"))
+                else:
+                    targets.add(url + entry.name)
+    return targets
+
+def page_targets(urls):
+    # A page folder answers with and without its trailing slash and as index.html
+    targets = set()
+    for url in urls:
+        targets.add(url)
+        if url.endswith("/"):
+            targets.add(url + "index.html")
+            if url != "/":
+                targets.add(url[:-1])
+    return targets
+
+def resolve_target(url, page):
+    # Root-relative path the url points at, None for external and in-page urls
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        path = posixpath.join(page if page.endswith("/") else posixpath.dirname(page) + "/", path)
+    resolved = posixpath.normpath(path)
+    # normpath drops the trailing slash of folder links
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+def check_links(collector, dest_dir, static_dir, profiler=NULL_PROFILER, generated=()):
+    # Returns (src, line, kind, url) for every internal link or image with no
+    # target. generated holds the root-relative urls of the files the build
+    # writes besides the pages, such as the feed or the search index
+    pages = {src: page_url(entry["dest"], dest_dir) for src, entry in collector.pages.items()}
+    known_pages = page_targets(pages.values())
+    known_files = static_targets(static_dir) if os.path.isdir(static_dir) else set()
+    known_files.update(generated)
+    broken = []
+    checked = 0
+    for src in sorted(collector.pages):
+        entry = collector.pages[src]
+        for kind, references, targets in (
+            ("link", entry["links"], (known_pages, known_files)),
+            ("image", entry["images"], (known_files,)),
+        ):
+            for url, line in references:
+                target = resolve_target(url, pages[src])
+                if target is None:
+                    continue
+                checked += 1
+                if not any(target in known for known in targets):
+                    broken.append((src, line, kind, url))
+    profiler.count("links_checked", checked)
+    profiler.count("links_broken", len(broken))
+    for src, line, kind, url in broken:
+        print(f"{src}:{line}: {'broken link' if kind == 'link' else 'missing image'} {url}")
+    print(f"Link check: {checked} internal links and images, {len(broken)} broken")
+    return broken
+
+def raise_for_broken(broken):
+    if broken:
+        raise Exception(f"{len(broken)} broken link(s) or missing image(s)")
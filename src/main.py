@@ -1,13 +1,236 @@
-from functions import copy_files, generate_pages_recursive
-import sys
+from functions import copy_files, generate_page, generate_page_streaming, generate_pages_recursive
+from incremental import generate_pages_incremental
+from parallel import generate_pages_parallel
+from pipeline import DEFAULT_IO_WORKERS, DEFAULT_QUEUE_SIZE, generate_pages_pipeline
+from sync import sync_files
+from profiling import NULL_PROFILER, Profiler
+from search_index import SEARCH_DIR, SearchIndex
+from sitemap import SITE_FILES, SiteCollector, write_site_files
+from linkcheck import check_links, raise_for_broken, static_targets
+from compress import DEFAULT_MIN_SIZE, compress_tree
+from minify import Minifier, minify_static
+from fingerprint import ASSET_MANIFEST, fingerprint_assets
+from images import scan_image_sizes
+from render_cache import DEFAULT_CACHE_DIR, get_block_cache
+import argparse
 
-def main():
-    if len(sys.argv) > 1: 
-        basepath = sys.argv[1]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the site from content/ into docs/")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep docs/ and only re-render pages whose source, template or basepath changed",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="keep docs/ and only copy static files that changed (implied by --incremental)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--link",
+        choices=("hard", "reflink"),
+        help="hardlink or reflink static files instead of copying when on the same filesystem",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render pages in N worker processes (0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="render each page block by block straight into its output file",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="overlap reading, rendering and writing pages, with -j renderer processes",
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=DEFAULT_IO_WORKERS,
+        metavar="N",
+        help=f"pages read and written at the same time with --pipeline (default {DEFAULT_IO_WORKERS})",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        metavar="N",
+        help=f"pages waiting between two --pipeline stages before the earlier one pauses (default {DEFAULT_QUEUE_SIZE})",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        metavar="N",
+        help="reuse the html of identical markdown blocks, keeping up to N blocks in memory (0 with --block-cache-dir keeps them on disk only)",
+    )
+    parser.add_argument(
+        "--block-cache-dir",
+        nargs="?",
+        const=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help=f"also keep rendered blocks on disk between builds (default {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="also write a sharded client-side search index to docs/search/",
+    )
+    parser.add_argument(
+        "--sitemap",
+        action="store_true",
+        help="also write sitemap.xml, a feed.xml of the blog and a links.json link graph",
+    )
+    parser.add_argument(
+        "--site-url",
+        default="",
+        metavar="URL",
+        help="origin put in front of page urls in sitemap.xml and feed.xml, e.g. https://example.com (required with --sitemap)",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report internal links and images that point at no page or static file",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="fail the build on broken links or missing images (implies --check-links)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip comments and collapsible whitespace from pages and static css, leaving pre and code alone",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files to content-hashed names and point pages and the template at them",
+    )
+    parser.add_argument(
+        "--image-sizes",
+        action="store_true",
+        help="give images from static/ their width and height, and lazy loading",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz, and .br/.zst when brotli/zstandard are installed, next to every text output",
+    )
+    parser.add_argument(
+        "--compress-jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="compress in N worker processes (default 0 uses every CPU core)",
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        default=DEFAULT_MIN_SIZE,
+        metavar="BYTES",
+        help=f"leave files smaller than this uncompressed (default {DEFAULT_MIN_SIZE})",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every build stage and print a report at the end",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="also write the profiling report as JSON to PATH (implies --profile)",
+    )
+    args = parser.parse_args(argv)
+    if args.pipeline and (args.incremental or args.stream):
+        parser.error("--pipeline cannot be combined with --incremental or --stream")
+    # Both sitemaps and feeds need absolute urls
+    if args.sitemap and not args.site_url:
+        parser.error("--sitemap needs --site-url")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    basepath = args.basepath
+    render = generate_page_streaming if args.stream else generate_page
+    profiler = Profiler() if args.profile or args.profile_json else NULL_PROFILER
+    page_options = {}
+    if args.block_cache is not None or args.block_cache_dir:
+        page_options["cache"] = get_block_cache(4096 if args.block_cache is None else args.block_cache, args.block_cache_dir)
+    if args.minify:
+        page_options["minify"] = Minifier()
+    if args.sitemap or args.check_links or args.strict:
+        page_options["site"] = SiteCollector()
+    if args.search:
+        page_options["search"] = SearchIndex("docs", basepath)
+    with profiler.stage("static"):
+        if args.incremental or args.sync:
+            sync_files("static/", "docs/", checksum=args.checksum, link=args.link)
+        else:
+            copy_files("static/", "docs/")
+    if args.minify:
+        with profiler.stage("minify"):
+            minify_static("docs", page_options["minify"], profiler)
+    if args.fingerprint:
+        # After minify, so the hashes are of the files actually served
+        with profiler.stage("fingerprint"):
+            variant = "minify" if args.minify else ""
+            page_options["assets"] = fingerprint_assets("static", "docs", variant, profiler=profiler)
+    if args.image_sizes:
+        with profiler.stage("images"):
+            page_options["image_sizes"] = scan_image_sizes("static", profiler=profiler)
+    if args.incremental:
+        generate_pages_incremental("content", "template.html", "docs", basepath, jobs=args.jobs, render=render, profiler=profiler, **page_options)
+    elif args.pipeline:
+        generate_pages_pipeline("content", "template.html", "docs", basepath, args.io_workers, args.jobs, args.queue_size, profiler, **page_options)
+    elif args.jobs != 1:
+        generate_pages_parallel("content", "template.html", "docs", basepath, args.jobs, render, profiler, **page_options)
     else:
-        basepath = "/"
-    copy_files("static/", "docs/")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+        generate_pages_recursive("content", "template.html", "docs", basepath, render, profiler, **page_options)
+    if args.sitemap:
+        with profiler.stage("sitemap"):
+            write_site_files(page_options["site"], "content", "docs", basepath, args.site_url, profiler)
+    if args.search:
+        with profiler.stage("search"):
+            page_options["search"].write(profiler)
+    broken = []
+    if args.check_links or args.strict:
+        # After the site files and search index, pages may link to them
+        generated = set()
+        if args.sitemap:
+            generated.update("/" + filename for filename in SITE_FILES)
+        if args.search:
+            generated.update(static_targets(f"docs/{SEARCH_DIR}", f"/{SEARCH_DIR}/"))
+        if "assets" in page_options:
+            generated.add("/" + ASSET_MANIFEST)
+            generated.update(page_options["assets"].urls.values())
+        with profiler.stage("check links"):
+            broken = check_links(page_options["site"], "docs", "static", profiler, generated)
+    # Last, so the site files and search index are compressed too
+    if args.compress:
+        with profiler.stage("compress"):
+            compress_tree("docs", args.compress_jobs, args.compress_min_size, profiler)
+    if "minify" in page_options:
+        print(page_options["minify"].summary())
+    if "cache" in page_options:
+        print(page_options["cache"].summary())
+    if profiler is not NULL_PROFILER:
+        profiler.finish()
+        print(profiler.report())
+        if args.profile_json:
+            profiler.write_json(args.profile_json)
+    if args.strict:
+        raise_for_broken(broken)
 
 
 if __name__ == "__main__":
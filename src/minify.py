@@ -0,0 +1,200 @@
+from output import write_if_changed
+from parallel import WorkerOption
+from profiling import NULL_PROFILER
+import os
+import re
+
+# Raw elements are copied untouched, whitespace inside them is significant
+RAW_ELEMENTS = ("pre", "code", "textarea", "script", "style")
+HTML_TOKEN = re.compile(
+    r"<!--.*?-->"
+    r"|<(pre|code|textarea|script|style)\b[^>]*>.*?</\1\s*>"
+    r"|<[^>]*>"
+    r"|[^<]+",
+    re.S | re.I,
+)
+TAG_NAME = re.compile(r"</?!?([a-zA-Z][\w-]*)")
+WHITESPACE = re.compile(r"\s+")
+# Whitespace next to these tags never renders, around any other tag it is one space
+BLOCK_ELEMENTS = {
+    "doctype", "html", "head", "body", "title", "meta", "link", "script", "style", "base",
+    "div", "p", "ul", "ol", "li", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote",
+    "nav", "header", "footer", "main", "section", "article", "aside", "figure", "figcaption",
+    "table", "thead", "tbody", "tfoot", "tr", "td", "th", "hr", "br", "form", "dl", "dt", "dd",
+}
+
+class HtmlMinifier():
+    # Feed it the page in chunks of any size, a tag, comment or raw element
+    # cut in two by a chunk boundary is held back until the rest arrives
+    def __init__(self):
+        self.buffer = ""
+        self.previous = None
+        self.pending_space = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        return self.drain(final=False)
+
+    def close(self):
+        return self.drain(final=True)
+
+    def drain(self, final):
+        out = []
+        pos = 0
+        buffer = self.buffer
+        while pos < len(buffer):
+            match = HTML_TOKEN.match(buffer, pos)
+            if match is None:
+                # A tag still missing its ">"
+                break
+            token = match.group(0)
+            if not final and self.incomplete(match, match.end() == len(buffer)):
+                break
+            self.add_token(token, out)
+            pos = match.end()
+        self.buffer = buffer[pos:]
+        if final:
+            # Whatever did not parse is kept as it was
+            out.append(self.buffer)
+            self.buffer = ""
+        return "".join(out)
+
+    def incomplete(self, match, at_end):
+        token = match.group(0)
+        if token[0] != "<":
+            # Text may go on in the next chunk
+            return at_end
+        if token.startswith("<!--"):
+            return not token.endswith("-->")
+        # An opening raw tag matched on its own means its closing tag has not arrived
+        return match.group(1) is None and not token.startswith("</") and self.tag_name(token) in RAW_ELEMENTS
+
+    def tag_name(self, token):
+        match = TAG_NAME.match(token)
+        return match.group(1).lower() if match else ""
+
+    def add_token(self, token, out):
+        if token.startswith("<!--"):
+            if token.startswith("<!--[if"):
+                out.append(token)
+            return
+        if token[0] == "<":
+            name = self.tag_name(token)
+            if self.pending_space and self.previous is not None:
+                if name not in BLOCK_ELEMENTS and self.previous not in BLOCK_ELEMENTS:
+                    out.append(" ")
+            out.append(token)
+            self.previous = name
+            self.pending_space = False
+            return
+        text = token.strip()
+        if not text:
+            self.pending_space = True
+            return
+        if (self.pending_space or token[0].isspace()) and self.previous not in BLOCK_ELEMENTS and self.previous is not None:
+            out.append(" ")
+        out.append(WHITESPACE.sub(" ", text))
+        self.previous = "#text"
+        self.pending_space = token[-1].isspace()
+
+def minify_html(html):
+    minifier = HtmlMinifier()
+    return minifier.feed(html) + minifier.close()
+
+CSS_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/|[^"\'/]+|/', re.S)
+CSS_SPACE = re.compile(r"\s*([{};,>])\s*")
+CSS_COLON = re.compile(r":\s+")
+
+def minify_css(css):
+    out = []
+    for match in CSS_TOKEN.finditer(css):
+        token = match.group(0)
+        if token.startswith("/*"):
+            out.append(" ")
+        elif token[0] in "\"'":
+            out.append(token)
+        else:
+            token = WHITESPACE.sub(" ", token)
+            token = CSS_SPACE.sub(r"\1", token)
+            out.append(CSS_COLON.sub(":", token))
+    css = "".join(out).strip()
+    # The cleanup above can leave a space where a comment touched a brace
+    css = CSS_SPACE.sub(r"\1", css)
+    return css.replace(";}", "}")
+
+class Minifier(WorkerOption):
+    # Passed to the renderers as minify=, counts what every page saved
+    def __init__(self):
+        self.stats = {"pages": 0, "bytes_before": 0, "bytes_after": 0}
+
+    def html(self, html, page=None):
+        minified = minify_html(html)
+        self.record(len(html.encode("utf-8")), len(minified.encode("utf-8")), page)
+        return minified
+
+    def record(self, before, after, page=None):
+        self.stats["pages"] += 1
+        self.stats["bytes_before"] += before
+        self.stats["bytes_after"] += after
+        if page is not None:
+            print(f"Minified {page}: {before} -> {after} bytes, saved {before - after}")
+
+    def writer(self, out, page=None):
+        return MinifyingWriter(out, self, page)
+
+    def take_stats(self):
+        stats = self.stats
+        self.stats = {"pages": 0, "bytes_before": 0, "bytes_after": 0}
+        return stats
+
+    def add_stats(self, stats):
+        for name, amount in stats.items():
+            self.stats[name] += amount
+
+    take_collected = take_stats
+    add_collected = add_stats
+
+    def summary(self):
+        saved = self.stats["bytes_before"] - self.stats["bytes_after"]
+        share = saved / self.stats["bytes_before"] if self.stats["bytes_before"] else 0.0
+        return f"Minify: {self.stats['pages']} files, {saved} bytes saved ({share:.1%})"
+
+class MinifyingWriter():
+    # Stands in for the output file of a streamed page
+    def __init__(self, out, minifier, page=None):
+        self.out = out
+        self.minifier = minifier
+        self.page = page
+        self.html = HtmlMinifier()
+        self.before = 0
+        self.after = 0
+
+    def write(self, chunk):
+        self.before += len(chunk.encode("utf-8"))
+        self.emit(self.html.feed(chunk))
+
+    def emit(self, text):
+        if text:
+            self.after += len(text.encode("utf-8"))
+            self.out.write(text)
+
+    def finish(self):
+        self.emit(self.html.close())
+        self.minifier.record(self.before, self.after, self.page)
+
+def minify_static(dest_dir, minifier, profiler=NULL_PROFILER):
+    # Static css is minified in docs/ after the copy, the source in static/ is
+    # left alone even when docs/ holds hard links to it
+    stack = [dest_dir]
+    while stack:
+        folder = stack.pop()
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(".css"):
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        css = f.read()
+                    data = minify_css(css).encode("utf-8")
+                    write_if_changed(entry.path, data)
+                    minifier.record(len(css.encode("utf-8")), len(data), entry.path)
@@ -0,0 +1,109 @@
+from profiling import NULL_PROFILER
+import filecmp
+import os
+import tempfile
+
+# Output folders this process already created or saw, so each page write
+# does not have to ask the filesystem again
+_known_dirs = set()
+# Read once at import, os.umask can only be read by setting it, which is not
+# safe while writer threads create files
+_umask = os.umask(0)
+os.umask(_umask)
+
+def plan_dirs(paths):
+    # Every folder the paths need, parents first
+    folders = set()
+    for path in paths:
+        folder = os.path.dirname(path)
+        while folder and folder not in folders:
+            folders.add(folder)
+            folder = os.path.dirname(folder)
+    return sorted(folders, key=lambda folder: (folder.count(os.sep), folder))
+
+def make_dirs(folders, profiler=NULL_PROFILER):
+    for folder in folders:
+        if folder in _known_dirs:
+            continue
+        try:
+            os.mkdir(folder)
+            profiler.count("mkdir_calls")
+        except FileExistsError:
+            profiler.count("mkdir_existing")
+        _known_dirs.add(folder)
+
+def prepare_output_dirs(pages, profiler=NULL_PROFILER):
+    # Creates the output tree for (src, dest) pairs once, before any page is written
+    with profiler.stage("mkdir"):
+        make_dirs(plan_dirs(dest for _, dest in pages), profiler)
+
+def ensure_dir(folder, profiler=NULL_PROFILER):
+    if not folder or folder in _known_dirs:
+        profiler.count("makedirs_saved")
+        return
+    os.makedirs(folder, exist_ok=True)
+    profiler.count("makedirs_calls")
+    _known_dirs.add(folder)
+
+def remember_dir(folder):
+    _known_dirs.add(folder)
+
+def forget_dirs(root):
+    # Called when a folder tree is deleted behind our back
+    prefix = os.path.join(root, "")
+    for folder in [folder for folder in _known_dirs if folder == root or folder.startswith(prefix)]:
+        _known_dirs.discard(folder)
+
+def output_mode(path):
+    # The mode of the file being replaced, or what open() would give a new one
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_umask
+
+def temp_file(path):
+    # Created next to the final file so the rename never crosses filesystems,
+    # the leading dot keeps it out of page discovery and static syncs. mkstemp
+    # makes it 0600, the rename would carry that over to the output
+    folder, filename = os.path.split(path)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=folder or ".", prefix=f".{filename}.", suffix=".tmp")
+    except FileNotFoundError:
+        # The folder was removed since it was created, make it again
+        _known_dirs.discard(folder)
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{filename}.", suffix=".tmp")
+    os.fchmod(fd, output_mode(path))
+    return os.fdopen(fd, "wb"), tmp_path
+
+def has_contents(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+def write_if_changed(path, data):
+    # Returns the number of bytes written, 0 when the file already held data
+    if has_contents(path, data):
+        return 0
+    f, tmp_path = temp_file(path)
+    try:
+        with f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(data)
+
+def replace_if_changed(tmp_path, path):
+    # Moves a finished temp file over path, or drops it when nothing changed
+    if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+        os.unlink(tmp_path)
+        return 0
+    size = os.path.getsize(tmp_path)
+    os.replace(tmp_path, path)
+    return size
@@ -0,0 +1,145 @@
+from fnmatch import fnmatch
+from front_matter import read_page_header
+import json
+import os
+
+PAGE_EXTENSIONS = (".md",)
+# Editor backups, swap files and hidden files such as .DS_Store
+DEFAULT_IGNORE = (".*", "_*", "*~", "#*#")
+DEFAULT_META_CACHE = os.path.join(".cache", "page-meta.json")
+META_CACHE_VERSION = 1
+
+class Page():
+    __slots__ = ("src", "dest", "size", "mtime_ns", "meta", "header_lines")
+
+    def __init__(self, src, dest, size, mtime_ns):
+        self.src = src
+        self.dest = dest
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # Front matter, filled in by PageIndex.load_meta
+        self.meta = None
+        self.header_lines = 0
+
+    def is_draft(self):
+        return bool(self.meta and self.meta.get("draft"))
+
+    def __eq__(self, other):
+        return (
+            self.src == other.src
+            and self.dest == other.dest
+            and self.size == other.size
+            and self.mtime_ns == other.mtime_ns
+        )
+
+    def __repr__(self):
+        return f"Page({self.src}, {self.dest}, {self.size}, {self.mtime_ns})"
+
+class PageIndex():
+    def __init__(self, pages=()):
+        self.pages = list(pages)
+        self.by_src = {page.src: page for page in self.pages}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    def get(self, src):
+        return self.by_src.get(src)
+
+    def pairs(self):
+        return [(page.src, page.dest) for page in self.pages]
+
+    def headers(self):
+        # src -> (meta, header_lines) as read_page_header gives them, so the
+        # renderers do not read the front matter again
+        return {page.src: (page.meta, page.header_lines) for page in self.pages}
+
+    def load_meta(self, cache_path=None):
+        # Reads the front matter of every page from its first bytes, with a
+        # cache_path only of the pages whose size or mtime changed
+        cached = load_meta_cache(cache_path) if cache_path else {}
+        entries = {}
+        for page in self.pages:
+            previous = cached.get(page.src)
+            if previous and previous["size"] == page.size and previous["mtime_ns"] == page.mtime_ns:
+                page.meta, page.header_lines = previous["meta"], previous["header_lines"]
+            else:
+                page.meta, page.header_lines = read_page_header(page.src)
+            entries[page.src] = {"size": page.size, "mtime_ns": page.mtime_ns, "meta": page.meta, "header_lines": page.header_lines}
+        if cache_path and entries != cached:
+            save_meta_cache(cache_path, entries)
+        return self
+
+    def published(self):
+        return PageIndex(page for page in self.pages if not page.is_draft())
+
+    def dated(self, folder=None):
+        # Pages with a date, newest first, for listing pages and feeds
+        prefix = os.path.join(folder, "") if folder else ""
+        pages = [page for page in self.pages if page.meta and page.meta.get("date") and page.src.startswith(prefix)]
+        return sorted(pages, key=lambda page: page.meta["date"], reverse=True)
+
+    def tags(self):
+        # Tag -> its pages, for tag pages
+        tagged = {}
+        for page in self.pages:
+            for tag in (page.meta or {}).get("tags", ()):
+                tagged.setdefault(tag, []).append(page)
+        return tagged
+
+def load_meta_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != META_CACHE_VERSION:
+        return {}
+    return cache.get("pages", {})
+
+def save_meta_cache(path, pages):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": META_CACHE_VERSION, "pages": pages}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def is_ignored(name, ignore=DEFAULT_IGNORE):
+    return any(fnmatch(name, pattern) for pattern in ignore)
+
+def is_page(name, extensions=PAGE_EXTENSIONS, ignore=DEFAULT_IGNORE):
+    return os.path.splitext(name)[1] in extensions and not is_ignored(name, ignore)
+
+def page_dest(name):
+    return os.path.splitext(name)[0] + ".html"
+
+def page_url(dest, dest_dir, basepath="/"):
+    path = os.path.relpath(dest, dest_dir).replace(os.sep, "/")
+    if path == "index.html":
+        return basepath
+    if path.endswith("/index.html"):
+        path = path[:-len("index.html")]
+    return basepath + path
+
+def iter_pages(dir_path_content, dest_dir_path, extensions=PAGE_EXTENSIONS, ignore=DEFAULT_IGNORE):
+    # One scandir per folder, the entries already know whether they are files
+    # and their stat is only fetched for the pages that are kept
+    with os.scandir(dir_path_content) as it:
+        entries = list(it)
+    for entry in entries:
+        if is_ignored(entry.name, ignore):
+            continue
+        if entry.is_dir():
+            yield from iter_pages(entry.path, os.path.join(dest_dir_path, entry.name), extensions, ignore)
+        elif entry.is_file() and is_page(entry.name, extensions, ()):
+            stat = entry.stat()
+            dest = os.path.join(dest_dir_path, page_dest(entry.name))
+            yield Page(entry.path, dest, stat.st_size, stat.st_mtime_ns)
+
+def scan_pages(dir_path_content, dest_dir_path, extensions=PAGE_EXTENSIONS, ignore=DEFAULT_IGNORE):
+    return PageIndex(iter_pages(dir_path_content, dest_dir_path, extensions, ignore))
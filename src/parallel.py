@@ -0,0 +1,89 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functions import find_page_index, generate_page, plan_pages
+from output import prepare_output_dirs
+from profiling import NULL_PROFILER, Profiler
+import os
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+_worker_options = {}
+
+def worker_option(cls, *settings):
+    # The one instance of a page option per process and settings
+    key = (os.getpid(), cls, settings)
+    if key not in _worker_options:
+        _worker_options[key] = cls(*settings)
+    return _worker_options[key]
+
+class WorkerOption():
+    # Base of the page options that fill up while pages render, such as the
+    # block cache. A pickled option arrives in a worker as that worker's own
+    # instance, what it collected travels back with each result through
+    # take_collected and is handed to the parent's copy with add_collected
+    def settings(self):
+        return ()
+
+    def __reduce__(self):
+        return (worker_option, (type(self),) + self.settings())
+
+def take_collected(page_options):
+    return {name: option.take_collected() for name, option in page_options.items() if isinstance(option, WorkerOption)}
+
+def add_collected(page_options, collected):
+    for name, data in collected.items():
+        page_options[name].add_collected(data)
+
+def render_in_worker(render, src, template_path, dest, basepath, profile, header, page_options):
+    # Runs in the pool, the page profile and collected option data travel back with the result
+    profiler = Profiler() if profile else NULL_PROFILER
+    render(src, template_path, dest, basepath, profiler=profiler, header=header, **page_options)
+    return (profiler if profile else None), take_collected(page_options)
+
+def render_pages(pages, template_path, basepath, jobs=1, render=generate_page, profiler=NULL_PROFILER, headers=None, **page_options):
+    # Returns the (src, error) pairs of the pages that failed, every other page
+    # is written. headers come from PageIndex.headers, a page without one has
+    # its front matter read by the renderer
+    if not jobs or jobs < 1:
+        jobs = default_jobs()
+    headers = headers or {}
+    failures = []
+    if jobs == 1 or len(pages) < 2:
+        for src, dest in pages:
+            try:
+                render(src, template_path, dest, basepath, profiler=profiler, header=headers.get(src), **page_options)
+            except Exception as e:
+                failures.append((src, e))
+    else:
+        profile = profiler is not NULL_PROFILER
+        with ProcessPoolExecutor(max_workers=min(jobs, len(pages))) as pool:
+            futures = {
+                pool.submit(render_in_worker, render, src, template_path, dest, basepath, profile, headers.get(src), page_options): src
+                for src, dest in pages
+            }
+            for future in as_completed(futures):
+                try:
+                    page_profile, collected = future.result()
+                except Exception as e:
+                    failures.append((futures[future], e))
+                    continue
+                if page_profile is not None:
+                    profiler.merge(page_profile)
+                add_collected(page_options, collected)
+    for src, error in failures:
+        print(f"Error generating page from {src}: {error}")
+    return failures
+
+def raise_for_failures(failures):
+    if failures:
+        sources = ", ".join(src for src, _ in failures)
+        raise Exception(f"{len(failures)} page(s) failed to render: {sources}")
+
+def generate_pages_parallel(dir_path_content, template_path, dest_dir_path, basepath, jobs=None, render=generate_page, profiler=NULL_PROFILER, **page_options):
+    with profiler.stage("discover"):
+        index = find_page_index(dir_path_content, dest_dir_path)
+    pages = index.pairs()
+    plan_pages(pages, page_options)
+    prepare_output_dirs(pages, profiler)
+    failures = render_pages(pages, template_path, basepath, jobs, render, profiler, index.headers(), **page_options)
+    raise_for_failures(failures)
@@ -0,0 +1,135 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functions import PageReferences, find_page_index, read_markdown, render_markdown_page, split_page, write_page
+from parallel import add_collected, default_jobs, raise_for_failures, take_collected
+from output import prepare_output_dirs
+from profiling import NULL_PROFILER, Profiler
+import asyncio
+import time
+
+DEFAULT_IO_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 16
+
+# Tells the next stage that no more pages are coming
+DONE = None
+
+def render_in_worker(md_content, meta, template_path, basepath, profile, page_options, page, collect_words=False, collect_references=False):
+    # Runs in the process pool, like parallel.render_in_worker but without the file I/O
+    profiler = Profiler() if profile else NULL_PROFILER
+    words = [] if collect_words else None
+    references = PageReferences() if collect_references else None
+    html_full_page = render_markdown_page(md_content, template_path, basepath, profiler, page=page, words=words, references=references, meta=meta, **page_options)
+    return html_full_page, (profiler if profile else None), take_collected(page_options), words, references
+
+async def run_pipeline(pages, template_path, basepath, io_workers=DEFAULT_IO_WORKERS, jobs=1, queue_size=DEFAULT_QUEUE_SIZE, profiler=NULL_PROFILER, cache=None, site=None, minify=None, assets=None, image_sizes=None, search=None, headers=None):
+    # Readers, renderers and writers are connected by bounded queues, a full
+    # queue makes the stage before it wait instead of piling pages up in memory.
+    # headers come from PageIndex.headers, as for parallel.render_pages
+    loop = asyncio.get_running_loop()
+    read_queue = asyncio.Queue(queue_size)
+    write_queue = asyncio.Queue(queue_size)
+    todo = iter(pages)
+    headers = headers or {}
+    started = {}
+    failures = []
+    readers = max(1, io_workers)
+    renderers = max(1, jobs)
+    profile = profiler is not NULL_PROFILER
+    # What render_markdown_page needs, the site and search collectors stay in the loop thread
+    page_options = {name: option for name, option in (("cache", cache), ("minify", minify), ("assets", assets), ("image_sizes", image_sizes)) if option is not None}
+
+    def thread_profiler():
+        # I/O threads time into their own profile, it is merged back in the loop thread
+        return Profiler() if profile else NULL_PROFILER
+
+    async def read_stage():
+        for src, dest in todo:
+            started[src] = time.perf_counter()
+            stage_profiler = thread_profiler()
+            try:
+                md_content = await loop.run_in_executor(io_pool, read_markdown, src, stage_profiler)
+            except Exception as e:
+                failures.append((src, e))
+                continue
+            profiler.merge(stage_profiler)
+            await read_queue.put((src, dest, md_content))
+
+    async def render_stage():
+        while True:
+            item = await read_queue.get()
+            if item is DONE:
+                return
+            src, dest, md_content = item
+            print(f"Generating page from {src} to {dest} using {template_path}")
+            try:
+                meta, md_content = split_page(md_content, headers.get(src))
+                if render_pool is None:
+                    # Rendering in the event loop thread still overlaps with the
+                    # reads and writes, those release the GIL while they block
+                    words = [] if search is not None else None
+                    references = PageReferences() if site is not None else None
+                    html_full_page = render_markdown_page(md_content, template_path, basepath, profiler, page=src, words=words, references=references, meta=meta, **page_options)
+                else:
+                    html_full_page, page_profile, collected, words, references = await loop.run_in_executor(
+                        render_pool, render_in_worker, md_content, meta, template_path, basepath, profile, page_options, src, search is not None, site is not None
+                    )
+                    if page_profile is not None:
+                        profiler.merge(page_profile)
+                    add_collected(page_options, collected)
+                if site is not None:
+                    site.add_page(src, dest, references, meta["title"], meta.get("date"))
+                if search is not None:
+                    search.add_page(src, dest, words, meta["title"])
+            except Exception as e:
+                failures.append((src, e))
+                continue
+            await write_queue.put((src, dest, html_full_page))
+
+    async def write_stage():
+        while True:
+            item = await write_queue.get()
+            if item is DONE:
+                return
+            src, dest, html_full_page = item
+            stage_profiler = thread_profiler()
+            try:
+                await loop.run_in_executor(io_pool, write_page, dest, html_full_page, stage_profiler, src)
+            except Exception as e:
+                failures.append((src, e))
+                continue
+            profiler.merge(stage_profiler)
+            profiler.page(src, time.perf_counter() - started[src])
+
+    async def close(tasks, queue, count):
+        await asyncio.gather(*tasks)
+        for _ in range(count):
+            await queue.put(DONE)
+
+    render_pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    with ThreadPoolExecutor(max_workers=readers * 2) as io_pool:
+        try:
+            read_tasks = [asyncio.create_task(read_stage()) for _ in range(readers)]
+            render_tasks = [asyncio.create_task(render_stage()) for _ in range(renderers)]
+            write_tasks = [asyncio.create_task(write_stage()) for _ in range(readers)]
+            await asyncio.gather(
+                close(read_tasks, read_queue, renderers),
+                close(render_tasks, write_queue, readers),
+                *write_tasks,
+            )
+        finally:
+            if render_pool is not None:
+                render_pool.shutdown()
+    for src, error in failures:
+        print(f"Error generating page from {src}: {error}")
+    return failures
+
+def generate_pages_pipeline(dir_path_content, template_path, dest_dir_path, basepath, io_workers=DEFAULT_IO_WORKERS, jobs=1, queue_size=DEFAULT_QUEUE_SIZE, profiler=NULL_PROFILER, cache=None, site=None, minify=None, assets=None, image_sizes=None, search=None):
+    with profiler.stage("discover"):
+        index = find_page_index(dir_path_content, dest_dir_path)
+    pages = index.pairs()
+    if search is not None:
+        search.plan(pages)
+    prepare_output_dirs(pages, profiler)
+    if not jobs or jobs < 1:
+        jobs = default_jobs()
+    failures = asyncio.run(run_pipeline(pages, template_path, basepath, io_workers, jobs, queue_size, profiler, cache, site, minify, assets, image_sizes, search, index.headers()))
+    raise_for_failures(failures)
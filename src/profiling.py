@@ -0,0 +1,103 @@
+from contextlib import contextmanager, nullcontext
+import json
+import time
+
+class Profiler():
+    def __init__(self, hooks=None):
+        # Each hook is called as hook(stage, page, seconds) after every timed stage
+        self.hooks = list(hooks or [])
+        self.stages = {}
+        self.counters = {}
+        self.pages = {}
+        self.started = time.perf_counter()
+        self.wall_time = None
+
+    @contextmanager
+    def stage(self, name, page=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, page, time.perf_counter() - start)
+
+    def record(self, name, page, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        for hook in self.hooks:
+            hook(name, page, seconds)
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def page(self, path, seconds):
+        self.pages[path] = seconds
+
+    def merge(self, other):
+        # Folds in the profile of a page rendered in a worker process
+        for name, seconds in other.stages.items():
+            self.record(name, None, seconds)
+        for name, amount in other.counters.items():
+            self.count(name, amount)
+        self.pages.update(other.pages)
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self.started
+        return self
+
+    def __getstate__(self):
+        # Hooks stay in the process that installed them
+        state = self.__dict__.copy()
+        state["hooks"] = []
+        return state
+
+    def to_dict(self, top=10):
+        wall_time = self.wall_time if self.wall_time is not None else time.perf_counter() - self.started
+        slowest = sorted(self.pages.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            "wall_time": wall_time,
+            "pages": len(self.pages),
+            "pages_per_second": len(self.pages) / wall_time if wall_time else 0.0,
+            "stages": dict(sorted(self.stages.items(), key=lambda item: item[1], reverse=True)),
+            "counters": dict(sorted(self.counters.items())),
+            "slowest_pages": [{"page": page, "seconds": seconds} for page, seconds in slowest],
+        }
+
+    def report(self, top=10):
+        data = self.to_dict(top)
+        stage_total = sum(data["stages"].values()) or 1.0
+        lines = [
+            f"Built {data['pages']} pages in {data['wall_time']:.3f}s ({data['pages_per_second']:.1f} pages/s)",
+            "",
+            f"{'stage':<16}{'seconds':>10}{'share':>8}",
+        ]
+        for name, seconds in data["stages"].items():
+            lines.append(f"{name:<16}{seconds:>10.3f}{seconds / stage_total:>8.1%}")
+        if data["counters"]:
+            lines.append("")
+            for name, amount in data["counters"].items():
+                lines.append(f"{name:<24}{amount:>14}")
+        if data["slowest_pages"]:
+            lines.append("")
+            lines.append(f"Slowest {len(data['slowest_pages'])} pages:")
+            for item in data["slowest_pages"]:
+                lines.append(f"{item['seconds'] * 1000:>10.2f} ms  {item['page']}")
+        return "\n".join(lines)
+
+    def write_json(self, path, top=10):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(top), f, indent=2)
+
+class NullProfiler():
+    # Stands in for Profiler when profiling is off, every call is a no-op
+    def stage(self, name, page=None):
+        return nullcontext()
+
+    def count(self, name, amount=1):
+        pass
+
+    def page(self, path, seconds):
+        pass
+
+    def merge(self, other):
+        pass
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from parallel import WorkerOption, worker_option
+import hashlib
+import os
+
+# Bump when block rendering changes so old disk entries are not reused
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(".cache", "blocks")
+
+class BlockCache(WorkerOption):
+    def __init__(self, max_entries=4096, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+    def settings(self):
+        # Worker processes get their own cache with the same settings
+        return (self.max_entries, self.disk_dir)
+
+    def key(self, block, salt=""):
+        return hashlib.sha256(f"{CACHE_VERSION}\0{salt}\0{block}".encode("utf-8")).hexdigest()
+
+    def disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key[2:] + ".html")
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return html
+        if self.disk_dir is not None:
+            try:
+                with open(self.disk_path(key), "r", encoding="utf-8") as f:
+                    html = f.read()
+            except FileNotFoundError:
+                pass
+            else:
+                self.remember(key, html)
+                self.stats["disk_hits"] += 1
+                return html
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, html):
+        self.remember(key, html)
+        if self.disk_dir is not None:
+            path = self.disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+
+    def remember(self, key, html):
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def take_stats(self):
+        stats = self.stats
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        return stats
+
+    def add_stats(self, stats):
+        for name, amount in stats.items():
+            self.stats[name] += amount
+
+    take_collected = take_stats
+    add_collected = add_stats
+
+    def summary(self):
+        hits, disk_hits, misses = self.stats["hits"], self.stats["disk_hits"], self.stats["misses"]
+        lookups = hits + disk_hits + misses
+        rate = (hits + disk_hits) / lookups if lookups else 0.0
+        return (
+            f"Block cache: {hits} memory hits, {disk_hits} disk hits, "
+            f"{misses} misses ({rate:.1%} hit rate)"
+        )
+
+def get_block_cache(max_entries=4096, disk_dir=None):
+    # One cache per process, a forked worker does not reuse its parent's counters
+    return worker_option(BlockCache, max_entries, disk_dir)
@@ -0,0 +1,245 @@
+from page_index import page_url
+from parallel import WorkerOption
+from output import remember_dir, replace_if_changed, temp_file, write_if_changed
+from profiling import NULL_PROFILER
+import heapq
+import itertools
+import json
+import os
+import tempfile
+
+# search/index.json lists the pages as [url, title] pairs and the shard file
+# for every term prefix. A shard maps each of its terms to one flat list of
+# ints: for every page holding the term, the page id minus the previous page
+# id, the number of positions, then each word position minus the previous one.
+SEARCH_VERSION = 1
+SEARCH_DIR = "search"
+# Postings held in memory before they are spilled to a sorted run on disk
+DEFAULT_MAX_POSTINGS = 200000
+DEFAULT_SHARD_CHARS = 1
+
+def encode_postings(postings):
+    ints = []
+    previous_doc = 0
+    for doc, positions in postings:
+        ints.append(doc - previous_doc)
+        ints.append(len(positions))
+        previous_position = 0
+        for position in positions:
+            ints.append(position - previous_position)
+            previous_position = position
+        previous_doc = doc
+    return ints
+
+def decode_postings(ints):
+    postings = []
+    doc = 0
+    i = 0
+    while i < len(ints):
+        doc += ints[i]
+        count = ints[i + 1]
+        positions = list(itertools.accumulate(ints[i + 2:i + 2 + count]))
+        postings.append((doc, positions))
+        i += 2 + count
+    return postings
+
+def shard_name(term, shard_chars=DEFAULT_SHARD_CHARS):
+    # Hex keeps any unicode prefix a safe file name
+    return term[:shard_chars].encode("utf-8").hex()
+
+class SearchIndexBuilder():
+    # urls holds the page urls in page id order, pages may arrive in any order
+    def __init__(self, spill_dir, urls, max_postings=DEFAULT_MAX_POSTINGS):
+        self.spill_dir = spill_dir
+        self.max_postings = max_postings
+        self.pages = [[url, None] for url in urls]
+        self.postings = {}
+        self.size = 0
+        self.runs = []
+
+    def add_page(self, doc, title, words):
+        self.pages[doc][1] = title
+        positions = {}
+        for position, word in enumerate(words):
+            positions.setdefault(word, []).append(position)
+        for term, term_positions in positions.items():
+            self.add_posting(term, doc, term_positions)
+        self.spill_if_full()
+
+    def add_posting(self, term, doc, positions):
+        self.postings.setdefault(term, []).append((doc, positions))
+        self.size += len(positions)
+
+    def spill_if_full(self):
+        if self.size >= self.max_postings:
+            self.spill()
+
+    def spill(self):
+        # Every run lists its terms sorted and each term's postings by page id
+        if not self.postings:
+            return
+        path = os.path.join(self.spill_dir, f"run-{len(self.runs)}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for term in sorted(self.postings):
+                postings = sorted(self.postings[term], key=lambda posting: posting[0])
+                f.write(json.dumps([term, postings], ensure_ascii=False))
+                f.write("\n")
+        self.runs.append(path)
+        self.postings = {}
+        self.size = 0
+
+    def iter_terms(self):
+        # Merges the sorted runs, only one term's postings are in memory at a time
+        self.spill()
+        files = [open(path, "r", encoding="utf-8") for path in self.runs]
+        try:
+            merged = heapq.merge(*(map(json.loads, f) for f in files), key=lambda item: item[0])
+            for term, group in itertools.groupby(merged, key=lambda item: item[0]):
+                # Pages were rendered in any order, so the runs' id ranges overlap
+                postings = [posting for _, postings in group for posting in postings]
+                postings.sort(key=lambda posting: posting[0])
+                yield term, postings
+        finally:
+            for f in files:
+                f.close()
+
+    def write(self, out_dir, shard_chars=DEFAULT_SHARD_CHARS, profiler=NULL_PROFILER):
+        os.makedirs(out_dir, exist_ok=True)
+        remember_dir(out_dir)
+        shards = {}
+        current = out = tmp_path = None
+        terms = 0
+
+        def close_shard():
+            out.write(b"}")
+            out.close()
+            written = replace_if_changed(tmp_path, os.path.join(out_dir, f"{current}.json"))
+            profiler.count("search_bytes_written", written)
+
+        # Terms come out sorted, so every shard is written in one go
+        for term, postings in self.iter_terms():
+            name = shard_name(term, shard_chars)
+            if name != current:
+                if out is not None:
+                    close_shard()
+                current = name
+                out, tmp_path = temp_file(os.path.join(out_dir, f"{name}.json"))
+                out.write(b"{")
+                shards[name] = 0
+            else:
+                out.write(b",")
+            entry = f"{json.dumps(term, ensure_ascii=False)}:{json.dumps(encode_postings(postings), separators=(',', ':'))}"
+            out.write(entry.encode("utf-8"))
+            shards[name] += 1
+            terms += 1
+        if out is not None:
+            close_shard()
+
+        meta = {
+            "version": SEARCH_VERSION,
+            "shard_chars": shard_chars,
+            "pages": self.pages,
+            "shards": {name: {"file": f"{name}.json", "terms": count} for name, count in shards.items()},
+        }
+        data = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        profiler.count("search_bytes_written", write_if_changed(os.path.join(out_dir, "index.json"), data))
+        # Shards of prefixes that no longer occur would be loaded by nothing
+        for filename in os.listdir(out_dir):
+            if filename.endswith(".json") and filename != "index.json" and filename[:-5] not in shards:
+                os.remove(os.path.join(out_dir, filename))
+        return {"pages": len(self.pages), "terms": terms, "shards": len(shards)}
+
+class SearchIndex(WorkerOption):
+    # Passed to the renderers as search=. plan() numbers the pages in url order
+    # before any is rendered, then each page's words go into the builder as
+    # soon as the page is done, so spilling keeps memory bounded during the
+    # build. A worker process only holds the pages it rendered until they
+    # travel back with its result
+    def __init__(self, dest_dir="docs", basepath="/", out_dir=None, max_postings=DEFAULT_MAX_POSTINGS, shard_chars=DEFAULT_SHARD_CHARS):
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.out_dir = out_dir or os.path.join(dest_dir, SEARCH_DIR)
+        self.max_postings = max_postings
+        self.shard_chars = shard_chars
+        self.builder = None
+        self.spill_dir = None
+        self.ids = {}
+        self.pending = {}
+
+    def settings(self):
+        return (self.dest_dir, self.basepath, self.out_dir, self.max_postings, self.shard_chars)
+
+    def plan(self, pages):
+        urls = sorted((page_url(dest, self.dest_dir, self.basepath), src) for src, dest in pages)
+        self.ids = {src: doc for doc, (_, src) in enumerate(urls)}
+        self.spill_dir = tempfile.TemporaryDirectory()
+        self.builder = SearchIndexBuilder(self.spill_dir.name, [url for url, _ in urls], self.max_postings)
+
+    def add_page(self, src, dest, words, title):
+        if self.builder is None:
+            self.pending[src] = [title, words]
+        else:
+            self.builder.add_page(self.ids[src], title, words)
+
+    def take_pages(self):
+        # The pages a worker rendered travel back to the parent with the result
+        pages = self.pending
+        self.pending = {}
+        return pages
+
+    def add_pages(self, pages):
+        for src, (title, words) in pages.items():
+            self.builder.add_page(self.ids[src], title, words)
+
+    take_collected = take_pages
+    add_collected = add_pages
+
+    def load_previous(self):
+        # The index.json a previous build wrote, None when there is none to reuse
+        try:
+            with open(os.path.join(self.out_dir, "index.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(meta, dict) or meta.get("version") != SEARCH_VERSION:
+            return None
+        return meta
+
+    def reusable(self):
+        # The planned pages the previous index holds, by source
+        meta = self.load_previous()
+        if meta is None:
+            return set()
+        urls = {url for url, _ in meta["pages"]}
+        return {src for src, doc in self.ids.items() if self.builder.pages[doc][0] in urls}
+
+    def reuse(self, sources):
+        # Copies the postings of unchanged pages out of the previous index, one
+        # shard at a time, before the new index replaces it
+        meta = self.load_previous()
+        if not sources:
+            return
+        old_ids = {url: doc for doc, (url, _) in enumerate(meta["pages"])}
+        new_ids = {}
+        for src in sources:
+            doc = self.ids[src]
+            old_doc = old_ids[self.builder.pages[doc][0]]
+            new_ids[old_doc] = doc
+            self.builder.pages[doc][1] = meta["pages"][old_doc][1]
+        for shard in meta["shards"].values():
+            with open(os.path.join(self.out_dir, shard["file"]), "r", encoding="utf-8") as f:
+                terms = json.load(f)
+            for term, ints in terms.items():
+                for old_doc, positions in decode_postings(ints):
+                    if old_doc in new_ids:
+                        self.builder.add_posting(term, new_ids[old_doc], positions)
+            self.builder.spill_if_full()
+
+    def write(self, profiler=NULL_PROFILER):
+        try:
+            stats = self.builder.write(self.out_dir, self.shard_chars, profiler)
+        finally:
+            self.spill_dir.cleanup()
+        profiler.count("search_spilled_runs", len(self.builder.runs))
+        print(f"Search index: {stats['pages']} pages, {stats['terms']} terms in {stats['shards']} shards")
+        return stats
@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from output import write_if_changed
+from page_index import page_url
+from parallel import WorkerOption
+from profiling import NULL_PROFILER
+from xml.sax.saxutils import escape
+import json
+import os
+
+FEED_SECTION = "blog"
+FEED_ITEMS = 20
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+SITE_FILES = ("sitemap.xml", "feed.xml", "links.json")
+
+class SiteCollector(WorkerOption):
+    # Passed to the renderers as site=, each page is recorded from what the
+    # renderer already parsed so nothing is read twice
+    def __init__(self):
+        self.pages = {}
+
+    def add_page(self, src, dest, references, title, date=None):
+        # references are the PageReferences the parser filled in while rendering
+        self.pages[src] = {
+            "dest": dest,
+            "title": title,
+            "links": references.links,
+            "images": references.images,
+            "mtime": os.stat(src).st_mtime,
+            "date": date,
+        }
+
+    def add_entry(self, src, entry):
+        self.pages[src] = entry
+
+    def take_pages(self):
+        # The pages a worker rendered travel back to the parent with the result
+        pages = self.pages
+        self.pages = {}
+        return pages
+
+    def add_pages(self, pages):
+        self.pages.update(pages)
+
+    take_collected = take_pages
+    add_collected = add_pages
+
+def site_pages(collector, dest_dir, basepath="/"):
+    # (url, src, entry) of every collected page in url order
+    pages = [(page_url(entry["dest"], dest_dir, basepath), src, entry) for src, entry in collector.pages.items()]
+    return sorted(pages, key=lambda page: page[0])
+
+def rebase_link(url, basepath):
+    return basepath + url[1:] if url.startswith("/") else url
+
+def iso_date(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+
+def published_at(entry):
+    # The front matter date when the page has one, otherwise its mtime
+    if entry.get("date"):
+        published = datetime.fromisoformat(entry["date"])
+        return published if published.tzinfo else published.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(entry["mtime"], timezone.utc)
+
+def sitemap_xml(pages, site_url=""):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{SITEMAP_NAMESPACE}">']
+    for url, _, entry in pages:
+        lines.append(f"  <url><loc>{escape(site_url + url)}</loc><lastmod>{iso_date(entry['mtime'])}</lastmod></url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+def feed_xml(pages, content_dir, basepath="/", site_url="", section=FEED_SECTION, limit=FEED_ITEMS):
+    section_dir = os.path.join(content_dir, section)
+    section_index = os.path.join(section_dir, "index.md")
+    items = [
+        (url, entry) for url, src, entry in pages
+        if src.startswith(os.path.join(section_dir, "")) and src != section_index
+    ]
+    items.sort(key=lambda item: published_at(item[1]), reverse=True)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0">',
+        "<channel>",
+        f"  <title>{escape(section.title())}</title>",
+        f"  <link>{escape(site_url + basepath + section + '/')}</link>",
+        f"  <description>Latest pages in {escape(section)}</description>",
+    ]
+    for url, entry in items[:limit]:
+        published = format_datetime(published_at(entry))
+        lines.extend([
+            "  <item>",
+            f"    <title>{escape(entry['title'])}</title>",
+            f"    <link>{escape(site_url + url)}</link>",
+            f"    <guid>{escape(site_url + url)}</guid>",
+            f"    <pubDate>{published}</pubDate>",
+            "  </item>",
+        ])
+    lines.extend(["</channel>", "</rss>"])
+    return "\n".join(lines) + "\n"
+
+def link_graph(pages, basepath="/"):
+    # Outbound links as they appear in the rendered html, and the pages linking to each page
+    urls = {url for url, _, _ in pages}
+    graph = {url: {"title": entry["title"], "links": [], "inbound": []} for url, _, entry in pages}
+    for url, _, entry in pages:
+        for link, _ in entry["links"]:
+            target = rebase_link(link, basepath)
+            graph[url]["links"].append(target)
+            # Folder links are often written without their trailing slash
+            page = target if target in urls else target + "/"
+            if page in urls and url not in graph[page]["inbound"]:
+                graph[page]["inbound"].append(url)
+    return graph
+
+def write_site_files(collector, content_dir, dest_dir, basepath="/", site_url="", profiler=NULL_PROFILER):
+    pages = site_pages(collector, dest_dir, basepath)
+    site_url = site_url.rstrip("/")
+    files = {
+        "sitemap.xml": sitemap_xml(pages, site_url),
+        "feed.xml": feed_xml(pages, content_dir, basepath, site_url),
+        "links.json": json.dumps(link_graph(pages, basepath), indent=1, ensure_ascii=False) + "\n",
+    }
+    for filename, text in files.items():
+        profiler.count("bytes_written", write_if_changed(os.path.join(dest_dir, filename), text.encode("utf-8")))
+    print(f"Site files: sitemap.xml, feed.xml and links.json for {len(pages)} pages")
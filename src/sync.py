@@ -0,0 +1,94 @@
+from incremental import file_hash, load_manifest, save_manifest
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT_STATIC_MANIFEST = os.path.join(".cache", "static-manifest.json")
+STATIC_MANIFEST_VERSION = 1
+FICLONE = 0x40049409
+
+def scan_files(src, rel=""):
+    # Yields (relative path, DirEntry) for every file below src
+    with os.scandir(os.path.join(src, rel) if rel else src) as entries:
+        for entry in entries:
+            path = os.path.join(rel, entry.name) if rel else entry.name
+            if entry.is_dir():
+                yield from scan_files(src, path)
+            else:
+                yield path, entry
+
+def is_unchanged(src_path, src_stat, dest_path, checksum):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    if dest_stat.st_size != src_stat.st_size:
+        return False
+    if checksum:
+        return file_hash(src_path) == file_hash(dest_path)
+    return dest_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+def reflink(src_path, dest_path):
+    if fcntl is None:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src_path, "rb") as src_file, open(dest_path, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+    shutil.copystat(src_path, dest_path)
+
+def place_file(src_path, dest_path, link, same_device):
+    # Returns "linked" when the file shares its data with the source, else "copied"
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    if link and same_device:
+        try:
+            if link == "hard":
+                os.link(src_path, dest_path)
+            else:
+                reflink(src_path, dest_path)
+            return "linked"
+        except OSError:
+            if os.path.lexists(dest_path):
+                os.remove(dest_path)
+    shutil.copy2(src_path, dest_path)
+    return "copied"
+
+def sync_files(src, dest, checksum=False, link=None, manifest_path=DEFAULT_STATIC_MANIFEST):
+    old_outputs = load_manifest(manifest_path, STATIC_MANIFEST_VERSION)
+    outputs = {}
+    stats = {"copied": 0, "linked": 0, "unchanged": 0, "removed": 0}
+    os.makedirs(dest, exist_ok=True)
+    same_device = os.stat(src).st_dev == os.stat(dest).st_dev
+    created_dirs = {dest}
+
+    for rel_path, entry in scan_files(src):
+        src_path = entry.path
+        dest_path = os.path.join(dest, rel_path)
+        src_stat = entry.stat()
+        folder = os.path.dirname(dest_path)
+        if folder not in created_dirs:
+            os.makedirs(folder, exist_ok=True)
+            created_dirs.add(folder)
+        if is_unchanged(src_path, src_stat, dest_path, checksum):
+            stats["unchanged"] += 1
+        else:
+            print(f"Syncing {src_path} to {dest_path}")
+            stats[place_file(src_path, dest_path, link, same_device)] += 1
+        outputs[dest_path] = {"source": src_path}
+
+    # Only files this sync put there are removed, rendered pages are left alone
+    for dest_path in old_outputs:
+        if dest_path not in outputs and os.path.lexists(dest_path):
+            print(f"Removing {dest_path}, its source is gone")
+            os.remove(dest_path)
+            stats["removed"] += 1
+
+    save_manifest(manifest_path, outputs, STATIC_MANIFEST_VERSION)
+    print(
+        f"Static sync: {stats['copied']} copied, {stats['linked']} linked, "
+        f"{stats['unchanged']} unchanged, {stats['removed']} removed"
+    )
+    return stats
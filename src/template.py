@@ -0,0 +1,69 @@
+import os
+import re
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+URL_ATTRIBUTE = re.compile(r'\b(href|src)="(/[^"]*)"')
+
+class Template():
+    def __init__(self, parts):
+        # Literal segments at even indices, slot names at odd indices
+        self.parts = parts
+
+    def render(self, values):
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = values[name] if name in values else f"{{{{ {name} }}}}"
+        return "".join(parts)
+
+    def stream(self, out, values):
+        # Values may be strings or iterables of string chunks
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                out.write(part)
+            elif part not in values:
+                out.write(f"{{{{ {part} }}}}")
+            elif isinstance(values[part], str):
+                out.write(values[part])
+            else:
+                for chunk in values[part]:
+                    out.write(chunk)
+
+    def __repr__(self):
+        return f"Template({self.parts})"
+
+def rebase_html(html, basepath):
+    return (
+        html
+        .replace('href="/', f'href="{basepath}')
+        .replace('src="/', f'src="{basepath}')
+    )
+
+def fingerprint_html(html, basepath, assets):
+    # Swaps asset urls for their fingerprinted names, then rebases them
+    def replace(match):
+        url = assets.get(match.group(2), match.group(2))
+        return f'{match.group(1)}="{basepath}{url[1:]}"'
+    return URL_ATTRIBUTE.sub(replace, html)
+
+def compile_template(text, basepath="/", assets=None):
+    parts = SLOT_PATTERN.split(text)
+    for i in range(0, len(parts), 2):
+        if assets is None:
+            parts[i] = rebase_html(parts[i], basepath)
+        else:
+            parts[i] = fingerprint_html(parts[i], basepath, assets)
+    return Template(parts)
+
+_templates = {}
+
+def load_template(template_path, basepath="/", assets=None):
+    mtime = os.stat(template_path).st_mtime_ns
+    key = (template_path, basepath, assets.digest if assets is not None else None)
+    cached = _templates.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(template_path, "r", encoding="utf-8") as html_file:
+        template = compile_template(html_file.read(), basepath, assets)
+    _templates[key] = (mtime, template)
+    return template
@@ -0,0 +1,82 @@
+import contextlib
+import gzip
+import io
+import os
+import unittest
+
+from compress import available_codecs, compress_file, compress_tree
+from fixtures import TempDirTestCase
+
+class TestCompress(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.docs = os.path.join(self.root, "docs")
+        self.cache = os.path.join(self.root, "compressed.json")
+        self.page = os.path.join(self.docs, "blog", "index.html")
+        self.write(self.page, "<p>hello</p>" * 200)
+        self.write(os.path.join(self.docs, "index.css"), "body { margin: 0; }\n" * 100)
+        self.write(os.path.join(self.docs, "small.html"), "<p>hi</p>")
+        self.write(os.path.join(self.docs, "image.png"), "\x89PNG" * 1000)
+
+    def compress(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compress_tree(self.docs, cache_path=self.cache, **options)
+
+    def test_gzip_always_available(self):
+        self.assertIn(".gz", available_codecs())
+
+    def test_compress_tree(self):
+        codecs = len(available_codecs())
+        totals = self.compress(jobs=1)
+        self.assertEqual(totals["compressed"], 2 * codecs)
+        self.assertEqual(totals["small"], 1)
+        with gzip.open(self.page + ".gz", "rb") as f, open(self.page, "rb") as original:
+            self.assertEqual(f.read(), original.read())
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "image.png.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "small.html.gz")))
+        self.assertEqual(os.stat(self.page + ".gz").st_mtime_ns, os.stat(self.page).st_mtime_ns)
+
+    def test_unchanged_sources_are_skipped(self):
+        self.compress(jobs=2)
+        totals = self.compress(jobs=2)
+        self.assertEqual(totals["compressed"], 0)
+        self.assertEqual(totals["unchanged"], 2 * len(available_codecs()))
+        self.write(self.page, "<p>changed</p>" * 200)
+        os.utime(self.page, ns=(0, os.stat(self.page).st_mtime_ns + 1))
+        self.assertEqual(compress_file(self.page, (".gz",))["compressed"], 1)
+        with gzip.open(self.page + ".gz", "rb") as f:
+            self.assertTrue(f.read().startswith(b"<p>changed</p>"))
+
+    def test_stale_variants_are_removed(self):
+        self.compress(jobs=1)
+        self.write(self.page, "<p>tiny</p>")
+        os.remove(os.path.join(self.docs, "index.css"))
+        self.compress(jobs=1)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+
+    def test_static_archives_are_kept(self):
+        archive = os.path.join(self.docs, "downloads", "data.csv.gz")
+        shipped = os.path.join(self.docs, "notes.txt.gz")
+        self.write(archive, b"\x1f\x8b archive")
+        self.write(shipped, b"\x1f\x8b notes")
+        self.compress(jobs=1)
+        os.remove(self.page)
+        self.compress(jobs=1)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertTrue(os.path.exists(archive))
+        self.assertTrue(os.path.exists(shipped))
+
+    def test_static_variants_of_compressed_files_are_kept(self):
+        # A shipped file with its own .gz next to it, small or incompressible
+        data = os.path.join(self.docs, "static", "data.json")
+        for text in ("[]", os.urandom(4096)):
+            self.write(data, text)
+            self.write(data + ".gz", b"\x1f\x8b shipped")
+            for _ in range(2):
+                self.compress(jobs=1)
+                with open(data + ".gz", "rb") as f:
+                    self.assertEqual(f.read(), b"\x1f\x8b shipped")
+
+if __name__ == '__main__':
+    unittest.main()
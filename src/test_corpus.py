@@ -0,0 +1,53 @@
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from bench_build import STAGES, run_stages
+from corpus import generate_corpus, png_bytes
+from fixtures import TempDirTestCase
+from functions import generate_pages_recursive
+
+class TestCorpus(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.summary = generate_corpus(self.root, {"pages": 12, "depth": 2, "fanout": 3, "blocks": 8, "images": 2})
+
+    def test_shape(self):
+        self.assertEqual(self.summary["pages"], 12)
+        pages = []
+        for folder, _, names in os.walk(os.path.join(self.root, "content")):
+            pages.extend(os.path.join(folder, name) for name in names)
+        self.assertEqual(len(pages), 12)
+        self.assertTrue(os.path.exists(os.path.join(self.root, "content", "section-1", "section-0", "page-1", "index.md")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "static", "images", "image-1.png")))
+
+    def test_same_seed_same_corpus(self):
+        with tempfile.TemporaryDirectory() as other:
+            generate_corpus(other, {"pages": 12, "depth": 2, "fanout": 3, "blocks": 8, "images": 2})
+            path = os.path.join("content", "section-0", "section-0", "page-0", "index.md")
+            with open(os.path.join(self.root, path), "rb") as a, open(os.path.join(other, path), "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_png_header(self):
+        data = png_bytes(32, 18)
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        self.assertEqual(struct.unpack(">II", data[16:24]), (32, 18))
+
+    def test_stages_match_generate_page(self):
+        template = os.path.join(self.root, "template.html")
+        content = os.path.join(self.root, "content")
+        staged = os.path.join(self.root, "staged")
+        results = run_stages(content, template, staged, "/base/")
+        self.assertEqual(results["pages"], 12)
+        self.assertEqual(sorted(results["stages"]), sorted(STAGES))
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(content, template, os.path.join(self.root, "docs"), "/base/")
+        path = os.path.join("section-0", "section-0", "page-0", "index.html")
+        with open(os.path.join(staged, path), "rb") as a, open(os.path.join(self.root, "docs", path), "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from fingerprint import AssetManifest, fingerprint_assets, fingerprinted_name
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming
+from render_cache import BlockCache
+from template import compile_template
+
+class TestFingerprint(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.cache = os.path.join(self.root, "asset-hashes.json")
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0; }")
+        self.write(os.path.join(self.static, "images", "a.png"), "\x89PNG one")
+
+    def build(self, variant=""):
+        # Stands in for the static stage, which places the files first
+        for folder, _, names in os.walk(self.static):
+            for name in names:
+                src = os.path.join(folder, name)
+                self.write(os.path.join(self.docs, os.path.relpath(src, self.static)), self.read(src))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            assets = fingerprint_assets(self.static, self.docs, variant, self.cache)
+        return assets, out.getvalue()
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name("index.css", "0123456789abcdef"), "index.0123456789.css")
+        self.assertEqual(fingerprinted_name("LICENSE", "0123456789abcdef"), "LICENSE.0123456789")
+
+    def test_copies_and_manifest(self):
+        assets, _ = self.build()
+        hashed = assets.get("/index.css")
+        self.assertRegex(hashed, r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(self.read(os.path.join(self.docs, hashed[1:])), "body { margin: 0; }")
+        # The original stays for anything linking to it by its plain name
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css")))
+        manifest = json.loads(self.read(os.path.join(self.docs, "asset-manifest.json")))
+        self.assertEqual(manifest["images/a.png"], assets.get("/images/a.png")[1:])
+
+    def test_hashes_are_cached_and_old_copies_removed(self):
+        first, _ = self.build()
+        _, output = self.build()
+        self.assertIn("0 hashed, 2 from cache, 0 copied", output)
+        # A different variant (minified css) is hashed again
+        _, output = self.build("minify")
+        self.assertIn("2 hashed, 0 from cache", output)
+
+        self.write(os.path.join(self.static, "images", "a.png"), "\x89PNG two, longer")
+        second, output = self.build("minify")
+        self.assertIn("1 hashed, 1 from cache, 1 copied, 1 removed", output)
+        self.assertEqual(first.get("/index.css"), second.get("/index.css"))
+        self.assertNotEqual(first.get("/images/a.png"), second.get("/images/a.png"))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, first.get("/images/a.png")[1:])))
+        self.assertNotEqual(first.digest, second.digest)
+
+class TestFingerprintedRender(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = os.path.join(self.root, "template.html")
+        self.src = os.path.join(self.root, "page.md")
+        self.write(self.template, '<link href="/index.css" /><a href="/blog/">{{ Title }}</a>{{ Content }}')
+        self.write(self.src, "# Hi\n\n![cat](/images/cat.png) and [css](/index.css) and [home](/)")
+        self.assets = AssetManifest({"/index.css": "/index.abc.css", "/images/cat.png": "/images/cat.def.png"})
+
+    def test_template_urls(self):
+        template = compile_template('<link href="/index.css" /><img src="/x.png" />{{ Content }}', "/base/", self.assets)
+        self.assertEqual(template.parts[0], '<link href="/base/index.abc.css" /><img src="/base/x.png" />')
+
+    def test_renderers_agree(self):
+        outputs = []
+        for render, options in (
+            (generate_page, {}),
+            (generate_page_streaming, {}),
+            (generate_page, {"cache": BlockCache()}),
+        ):
+            dest = os.path.join(self.root, f"{render.__name__}{len(outputs)}.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(self.src, self.template, dest, "/", assets=self.assets, **options)
+            outputs.append(self.read(dest))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        self.assertIn('<link href="/index.abc.css" /><a href="/blog/">Hi</a>', outputs[0])
+        self.assertIn('src="/images/cat.def.png"', outputs[0])
+        self.assertIn('<a href="/index.abc.css">css</a>', outputs[0])
+        self.assertIn('<a href="/">home</a>', outputs[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import contextlib
+import io
+import os
+import unittest
+
+import front_matter
+import functions
+from fixtures import TempDirTestCase
+from front_matter import blank_header, blank_lines, parse_front_matter, read_page_header, split_front_matter
+from functions import generate_page, generate_page_streaming, generate_pages_recursive
+from parallel import generate_pages_parallel
+from pipeline import generate_pages_pipeline
+
+PAGE = "---\ntitle: \"Hello: world\"\ndate: 2024-03-01\ntags: [one, \"two\"]\ndraft: false\n# a comment\n---\n# Heading\n\nBody [link](/x)\n"
+
+class TestParse(unittest.TestCase):
+    def test_values(self):
+        meta, count = parse_front_matter(PAGE.split("\n"))
+        self.assertEqual(meta, {"title": "Hello: world", "date": "2024-03-01", "tags": ["one", "two"], "draft": False})
+        self.assertEqual(count, 7)
+        self.assertEqual(parse_front_matter(["---", "tags: a, b", "draft: yes", "---"])[0], {"tags": ["a", "b"], "draft": True})
+
+    def test_no_front_matter(self):
+        self.assertEqual(parse_front_matter(["# Title", "---"]), ({}, 0))
+        # Without a closing fence the dashes are page text
+        self.assertEqual(parse_front_matter(["---", "title: x"]), ({}, 0))
+        self.assertEqual(split_front_matter("# Title\n"), ({}, "# Title\n"))
+        # A thematic break then prose is not a broken header
+        page = "---\nA thematic break then text\n\n# Title"
+        self.assertEqual(split_front_matter(page), ({}, page))
+
+    def test_errors(self):
+        with self.assertRaises(Exception):
+            parse_front_matter(["---", "no colon here", "---"])
+        with self.assertRaises(Exception):
+            parse_front_matter(["---", "date: last tuesday", "---"])
+        with self.assertRaises(Exception):
+            parse_front_matter(["---", "draft: maybe", "---"])
+
+    def test_split_keeps_line_numbers(self):
+        meta, body = split_front_matter(PAGE)
+        self.assertEqual(meta["title"], "Hello: world")
+        self.assertEqual(body.split("\n")[7:], PAGE.split("\n")[7:])
+        self.assertEqual(body.split("\n")[:7], [""] * 7)
+        lines = list(blank_header(io.StringIO(PAGE), 7))
+        self.assertEqual("".join(lines), body)
+        self.assertEqual(blank_lines(PAGE, 7), body)
+        self.assertEqual(blank_lines("---\na: b\n---", 3), split_front_matter("---\na: b\n---")[1])
+
+class TestReadPageHeader(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.chunk = front_matter.HEADER_CHUNK
+
+    def tearDown(self):
+        front_matter.HEADER_CHUNK = self.chunk
+
+    def read_header(self, text):
+        path = os.path.join(self.root, "page.md")
+        self.write(path, text)
+        return read_page_header(path)
+
+    def test_any_chunk_size(self):
+        expected = parse_front_matter(PAGE.split("\n"))
+        for size in (1, 3, 8, 100):
+            front_matter.HEADER_CHUNK = size
+            self.assertEqual(self.read_header(PAGE), expected)
+
+    def test_reads_only_the_header(self):
+        front_matter.HEADER_CHUNK = 16
+        path = os.path.join(self.root, "page.md")
+        # Not valid UTF-8, so decoding the body would fail
+        self.write(path, b"---\ntitle: T\n---\n# H\n" + b"\xff" * 1000)
+        self.assertEqual(read_page_header(path), ({"title": "T"}, 3))
+
+    def test_title_falls_back_to_heading(self):
+        self.assertEqual(self.read_header("---\ndate: 2024-01-01\n---\n\n# Post\n"), ({"date": "2024-01-01", "title": "Post"}, 3))
+        self.assertEqual(self.read_header("# Plain\n\ntext"), ({"title": "Plain"}, 0))
+        self.assertEqual(self.read_header(""), ({}, 0))
+        self.assertEqual(self.read_header("---\nJust text\n\n# Plain\n"), ({"title": "Plain"}, 0))
+
+class TestRender(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.root, "page.md")
+        self.write(os.path.join(self.root, "template.html"), "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.root, "post.html"), "<h1 class=post>{{ Title }}</h1>{{ Content }}")
+        self.write(self.src, PAGE.replace("draft: false", "template: post.html"))
+
+    def test_renderers_agree(self):
+        outputs = []
+        for render in (generate_page, generate_page_streaming):
+            dest = os.path.join(self.root, render.__name__ + ".html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(self.src, os.path.join(self.root, "template.html"), dest, "/")
+            outputs.append(self.read(dest))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], '<h1 class=post>Hello: world</h1><div><h1>Heading</h1><p>Body <a href="/x">link</a></p></div>')
+
+    def test_header_from_the_index(self):
+        # Given the header the page index read, the renderers use it as it is
+        header = ({"title": "From the index", "template": "post.html"}, 7)
+        for render in (generate_page, generate_page_streaming):
+            dest = os.path.join(self.root, render.__name__ + ".html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(self.src, os.path.join(self.root, "template.html"), dest, "/", header=header)
+            self.assertTrue(self.read(dest).startswith("<h1 class=post>From the index</h1><div><h1>Heading</h1>"))
+
+    def test_builds_do_not_parse_front_matter_again(self):
+        def parsed(*args):
+            raise Exception("front matter parsed again")
+
+        for name in ("split_front_matter", "read_page_header"):
+            self.addCleanup(setattr, functions, name, getattr(functions, name))
+            setattr(functions, name, parsed)
+        content = os.path.join(self.root, "content")
+        self.write(os.path.join(content, "index.md"), PAGE)
+        template = os.path.join(self.root, "template.html")
+        docs = os.path.join(self.root, "docs")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(content, template, docs, "/")
+            generate_pages_recursive(content, template, docs, "/", render=generate_page_streaming)
+            generate_pages_parallel(content, template, docs, "/", jobs=1)
+            generate_pages_pipeline(content, template, docs, "/")
+        self.assertIn("<title>Hello: world</title>", self.read(os.path.join(docs, "index.html")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,8 @@
+import io
+import contextlib
+import os
+import random
+import tempfile
 import unittest
 
 from functions import (
@@ -13,6 +18,10 @@ from functions import (
         strip_markers,
         markdown_to_html_node,
         extract_title,
+        rebase_urls,
+        scan_blocks,
+        generate_page,
+        generate_page_streaming,
     )
 from textnode import TextType, BlockType, TextNode
 
@@ -255,6 +264,50 @@ class TestTextToTextNodes(unittest.TestCase):
                                                     TextNode(" and a", TextType.TEXT),
                                                 ])
         
+def multi_pass_text_to_textnodes(text):
+    main_node = TextNode(text, TextType.TEXT)
+    bold_split = split_nodes_delimiter([main_node], "**", TextType.BOLD)
+    italic_split = split_nodes_delimiter(bold_split, "_", TextType.ITALIC)
+    code_split = split_nodes_delimiter(italic_split, "`", TextType.CODE)
+    image_split = split_nodes_image(code_split)
+    return split_nodes_link(image_split)
+
+INLINE_PIECES = [
+    "word", " ", "  ", "\n", "**", "*", "_", "`", "!", "[", "]", "(", ")",
+    "[link](/path)", "![alt](/img.png)", "[](/empty)", "![](/no-alt)", "[a](b", "x_y",
+]
+
+class TestTextToTextNodesEquivalence(unittest.TestCase):
+    def assert_same_as_multi_pass(self, text):
+        try:
+            expected = multi_pass_text_to_textnodes(text)
+        except Exception as e:
+            with self.assertRaises(Exception) as cm:
+                text_to_textnodes(text)
+            self.assertEqual(str(cm.exception), str(e))
+            return
+        self.assertEqual(text_to_textnodes(text), expected, repr(text))
+
+    def test_fuzz(self):
+        rng = random.Random(1234)
+        for _ in range(5000):
+            text = "".join(rng.choice(INLINE_PIECES) for _ in range(rng.randint(0, 25)))
+            self.assert_same_as_multi_pass(text)
+
+    def test_repeated_markdown(self):
+        self.assert_same_as_multi_pass("[a](b) [a](b) ![a](b) ![a](b)")
+        self.assert_same_as_multi_pass("![](b) [](b)")
+        self.assert_same_as_multi_pass("**[a](b)** _![c](d)_ `[e](f)` [g](h)")
+
+    def test_whitespace_between_media_is_dropped(self):
+        self.assert_same_as_multi_pass("![a](b) ![c](d) [e](f)  [g](h)  ")
+
+    def test_many_links(self):
+        text = " and ".join(f"[link {i}](/page/{i})" for i in range(2000))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 3999)
+        self.assertEqual(nodes, multi_pass_text_to_textnodes(text))
+
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
         md = """
@@ -299,6 +352,60 @@ This is the same paragraph on a new line
             ],
         )
 
+def multi_pass_blocks(markdown):
+    blocks = []
+    for block in markdown_to_blocks(markdown):
+        block_type = block_to_block_type(block)
+        blocks.append((block_type, block, strip_markers(block, block_type)))
+    return blocks
+
+BLOCK_PIECES = [
+    "text", " ", "\t", "\n", "\n\n", "\n\n\n", "  \n", "\r", "#", "# ", "####### ", "-", "- ", ">", "> ",
+    "1. ", "2. ", "3.", "10. ", "٣. ", "```", "**", "_", "`x`",
+]
+
+class TestScanBlocks(unittest.TestCase):
+    def test_fuzz_matches_multi_pass(self):
+        rng = random.Random(42)
+        for _ in range(5000):
+            md = "".join(rng.choice(BLOCK_PIECES) for _ in range(rng.randint(0, 20)))
+            blocks = multi_pass_blocks(md)
+            # An open fence followed by a blank line is where the two parsers disagree
+            if any(t != BlockType.CODE and b.startswith("```") for t, b, _ in blocks):
+                continue
+            self.assertEqual(list(scan_blocks(md.split("\n"))), blocks, repr(md))
+            self.assertEqual(list(scan_blocks(io.StringIO(md))), blocks, repr(md))
+
+    def test_content_pages_match_multi_pass(self):
+        content = os.path.join(os.path.dirname(__file__), "..", "content")
+        for folder, _, names in os.walk(content):
+            for name in names:
+                with open(os.path.join(folder, name), encoding="utf-8") as f:
+                    md = f.read()
+                self.assertEqual(list(scan_blocks(md.split("\n"))), multi_pass_blocks(md))
+
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "# Title\n\n```\nfirst\n\n\nsecond\n```\n\nAfter"
+        self.assertEqual(
+            list(scan_blocks(md.split("\n"))),
+            [
+                (BlockType.HEADING, "# Title", "Title"),
+                (BlockType.CODE, "```\nfirst\n\n\nsecond\n```", "first\n\n\nsecond"),
+                (BlockType.PARAGRAPH, "After", "After"),
+            ],
+        )
+
+    def test_inline_fence(self):
+        self.assertEqual(list(scan_blocks(["```one line```", "", "next"])), [
+            (BlockType.CODE, "```one line```", "```one line```"),
+            (BlockType.PARAGRAPH, "next", "next"),
+        ])
+
+    def test_fenced_code_in_html(self):
+        md = "```\ndef f():\n\n    return 1\n```"
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html, "<div><pre><code>def f():\n\n    return 1</code></pre></div>")
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_heading(self):
         block = "# This is a heading"
@@ -491,6 +598,40 @@ Another paragraph here.
             "</div>"
         )
 
+class TestRebaseUrls(unittest.TestCase):
+    def test_links_and_images(self):
+        md = "# Title\n\n[home](/) ![pic](/images/a.png) [ext](https://example.com)\n\n```\nhref=\"/raw\"\n```"
+        node = rebase_urls(markdown_to_html_node(md), "/site/")
+        self.assertEqual(
+            node.to_html(),
+            '<div><h1>Title</h1><p><a href="/site/">home</a> <img src="/site/images/a.png" alt="pic"></img>'
+            '<a href="https://example.com">ext</a></p><pre><code>href="/raw"</code></pre></div>',
+        )
+
+    def test_root_basepath_is_unchanged(self):
+        node = rebase_urls(markdown_to_html_node("[home](/blog)"), "/")
+        self.assertEqual(node.to_html(), '<div><p><a href="/blog">home</a></p></div>')
+
+class TestGeneratePageStreaming(unittest.TestCase):
+    def test_same_output_as_generate_page(self):
+        md = "# Title\n\nSome **bold** [link](/page)\n\n\n- a\n- b\n\n```\ncode\n```\n\n> quote"
+        template = '<title>{{ Title }}</title><link href="/index.css">{{ Content }}'
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "index.md")
+            template_path = os.path.join(tmp, "template.html")
+            for path, text in ((src, md), (template_path, template)):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+            outputs = []
+            for render in (generate_page, generate_page_streaming):
+                dest = os.path.join(tmp, render.__name__, "index.html")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    render(src, template_path, dest, "/site/")
+                with open(dest, "r", encoding="utf-8") as f:
+                    outputs.append(f.read())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('<a href="/site/page">link</a>', outputs[1])
+
 class TestExtractTitle(unittest.TestCase):
     def test_extract_h1(self):
         md = """
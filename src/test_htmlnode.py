@@ -1,6 +1,6 @@
 import unittest
 
-from htmlnode import HTMLNode, LeafNode, ParentNode
+from htmlnode import HTMLNode, LeafNode, ParentNode, EMPTY_CHILDREN, EMPTY_PROPS
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_html(self):
@@ -16,6 +16,21 @@ class TestHTMLNode(unittest.TestCase):
         node = HTMLNode(tag="p", value="Hello, world!", children=[children_node], props={"class": "greeting", "id": "intro"})
         self.assertEqual(node.__repr__(), f"Tag: {node.tag} \nValue: {node.value} \nChildren:{node.children} \nProps:{node.props_to_html()}")
 
+    def test_slots(self):
+        node = LeafNode("b", "bold")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
+
+    def test_shared_empty_containers(self):
+        first = LeafNode("b", "one")
+        second = ParentNode("p", [first])
+        self.assertIs(first.children, EMPTY_CHILDREN)
+        self.assertIs(first.props, second.props)
+        self.assertIs(second.props, EMPTY_PROPS)
+        with self.assertRaises(TypeError):
+            first.props["class"] = "x"
+
 class TestLeafNode(unittest.TestCase):
     def test_leaf_to_html_p(self):
         node = LeafNode("p", "Hello, world!")
@@ -72,5 +87,27 @@ class TestParentNode(unittest.TestCase):
 
         self.assertEqual(parent_node.to_html(), '<div><div>child</div><div>child1</div><div>child2</div><div><div href="https://www.google.com"><div href="https://www.google.com">child3</div></div></div></div>')
 
+    def test_to_html_props_with_angle_brackets(self):
+        child_node = LeafNode("span", "child")
+        parent_node = ParentNode("div", [child_node], {"title": "a><b"})
+        self.assertEqual(parent_node.to_html(), '<div title="a><b"><span>child</span></div>')
+
+    def test_to_html_deep_tree(self):
+        node = LeafNode("b", "leaf")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(html, "<span>" * 5000 + "<b>leaf</b>" + "</span>" * 5000)
+
+    def test_to_html_missing_children_in_subtree(self):
+        parent_node = ParentNode("div", [LeafNode("b", "ok"), ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            parent_node.to_html()
+
+    def test_iter_html_joins_to_to_html(self):
+        parent_node = ParentNode("div", [LeafNode("b", "bold"), ParentNode("p", [LeafNode(None, "text")])])
+        self.assertEqual("".join(parent_node.iter_html()), parent_node.to_html())
+        self.assertEqual(parent_node.to_html(), "<div><b>bold</b><p>text</p></div>")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+import contextlib
+import io
+import os
+import struct
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming
+from images import ImageSizes, image_size, scan_image_sizes
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+
+def jpeg(width, height):
+    # An APP0 segment before the frame header, like most encoders write
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    frame = b"\xff\xc2" + struct.pack(">HBHH", 17, 8, height, width) + b"\x03" + b"\x00" * 9
+    return b"\xff\xd8" + app0 + frame + b"\xff\xda" + b"\x00" * 50
+
+class TestImageSize(TempDirTestCase):
+    def size_of(self, data):
+        path = os.path.join(self.root, "image")
+        self.write(path, data)
+        return image_size(path)
+
+    def test_png_gif_jpeg(self):
+        self.assertEqual(self.size_of(png(1100, 438)), (1100, 438))
+        self.assertEqual(self.size_of(b"GIF89a" + struct.pack("<HH", 16, 9) + b"\x00" * 20), (16, 9))
+        self.assertEqual(self.size_of(jpeg(640, 480)), (640, 480))
+
+    def test_webp(self):
+        lossy = b"RIFF\x00\x00\x00\x00WEBPVP8 \x00\x00\x00\x00" + b"\x00\x00\x00\x9d\x01\x2a" + struct.pack("<HH", 320, 200)
+        self.assertEqual(self.size_of(lossy), (320, 200))
+        bits = (320 - 1) | (200 - 1) << 14
+        lossless = b"RIFF\x00\x00\x00\x00WEBPVP8L\x00\x00\x00\x00\x2f" + bits.to_bytes(4, "little") + b"\x00" * 5
+        self.assertEqual(self.size_of(lossless), (320, 200))
+        extended = b"RIFF\x00\x00\x00\x00WEBPVP8X\x0a\x00\x00\x00" + b"\x00" * 4 + (319).to_bytes(3, "little") + (199).to_bytes(3, "little")
+        self.assertEqual(self.size_of(extended), (320, 200))
+
+    def test_unknown_and_truncated(self):
+        self.assertIsNone(self.size_of(b"<svg></svg>"))
+        self.assertIsNone(self.size_of(jpeg(640, 480)[:24]))
+
+class TestImageSizes(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.cache = os.path.join(self.root, "image-sizes.json")
+        self.write(os.path.join(self.static, "images", "a.png"), png(10, 20))
+        self.write(os.path.join(self.static, "images", "b.jpg"), jpeg(30, 40))
+        self.write(os.path.join(self.static, "index.css"), b"body {}")
+
+    def scan(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            sizes = scan_image_sizes(self.static, self.cache)
+        return sizes, out.getvalue()
+
+    def test_sizes_are_cached(self):
+        sizes, output = self.scan()
+        self.assertEqual(sizes.get("/images/a.png"), [10, 20])
+        self.assertEqual(sizes.get("/images/b.jpg"), [30, 40])
+        self.assertIn("2 images, 2 read, 0 from cache", output)
+        again, output = self.scan()
+        self.assertIn("0 read, 2 from cache", output)
+        self.assertEqual(again.digest, sizes.digest)
+        self.write(os.path.join(self.static, "images", "a.png"), png(100, 200) + b"\x00")
+        changed, output = self.scan()
+        self.assertIn("1 read, 1 from cache", output)
+        self.assertEqual(changed.get("/images/a.png"), [100, 200])
+        self.assertNotEqual(changed.digest, sizes.digest)
+
+    def test_rendered_attributes(self):
+        template = os.path.join(self.root, "template.html")
+        src = os.path.join(self.root, "page.md")
+        self.write(template, "{{ Content }}")
+        self.write(src, "# Hi\n\n![a](/images/a.png) ![far](https://example.com/x.png)")
+        sizes = ImageSizes({"/images/a.png": [10, 20]})
+        outputs = []
+        for render in (generate_page, generate_page_streaming):
+            dest = os.path.join(self.root, render.__name__ + ".html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(src, template, dest, "/base/", image_sizes=sizes)
+            outputs.append(self.read(dest))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('<img src="/base/images/a.png" alt="a" width="10" height="20" loading="lazy" decoding="async"></img>', outputs[0])
+        self.assertIn('<img src="https://example.com/x.png" alt="far" loading="lazy" decoding="async"></img>', outputs[0])
+
+if __name__ == '__main__':
+    unittest.main()
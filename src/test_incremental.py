@@ -0,0 +1,97 @@
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from incremental import MANIFEST_VERSION, generate_pages_incremental, load_manifest, save_manifest
+
+TEMPLATE = "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}"
+
+class TestIncrementalBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, "manifest.json")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHello")
+
+    def build(self, basepath="/"):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_pages_incremental(self.content, self.template, self.dest, basepath, self.manifest)
+
+    def test_first_build_renders_everything(self):
+        stats = self.build()
+        self.assertEqual(stats, {"rendered": 2, "unchanged": 0, "removed": 0})
+        self.assertEqual(len(load_manifest(self.manifest, MANIFEST_VERSION)), 2)
+        self.assertIn("<p>Hello</p>", self.read(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_unchanged_build_renders_nothing(self):
+        self.build()
+        stats = self.build()
+        self.assertEqual(stats, {"rendered": 0, "unchanged": 2, "removed": 0})
+
+    def test_only_changed_page_is_rendered(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHello again")
+        stats = self.build()
+        self.assertEqual(stats, {"rendered": 1, "unchanged": 1, "removed": 0})
+        self.assertIn("<p>Hello again</p>", self.read(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_touch_without_change_is_not_rendered(self):
+        self.build()
+        path = os.path.join(self.content, "index.md")
+        os.utime(path, ns=(0, 0))
+        stats = self.build()
+        self.assertEqual(stats["rendered"], 0)
+
+    def test_template_change_renders_everything(self):
+        self.build()
+        self.write(self.template, TEMPLATE + "<footer></footer>")
+        stats = self.build()
+        self.assertEqual(stats["rendered"], 2)
+
+    def test_basepath_change_renders_everything(self):
+        self.build()
+        stats = self.build("/site/")
+        self.assertEqual(stats["rendered"], 2)
+        self.assertIn('href="/site/"', self.read(os.path.join(self.dest, "index.html")))
+
+    def test_missing_output_is_rendered(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        stats = self.build()
+        self.assertEqual(stats, {"rendered": 1, "unchanged": 1, "removed": 0})
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        stats = self.build()
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+        self.assertEqual(len(load_manifest(self.manifest, MANIFEST_VERSION)), 1)
+
+    def test_failed_page_is_retried_and_keeps_old_output(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        with self.assertRaises(Exception):
+            self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+        self.assertEqual(len(load_manifest(self.manifest, MANIFEST_VERSION)), 1)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nFixed")
+        stats = self.build()
+        self.assertEqual(stats, {"rendered": 1, "unchanged": 1, "removed": 0})
+
+    def test_manifest_versions_are_per_cache(self):
+        # A cache is only dropped when its own version changes
+        path = os.path.join(self.root, "cache.json")
+        save_manifest(path, {"a": 1}, 1)
+        self.assertEqual(load_manifest(path, 1), {"a": 1})
+        self.assertEqual(load_manifest(path, 2), {})
+
+if __name__ == '__main__':
+    unittest.main()
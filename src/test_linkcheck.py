@@ -0,0 +1,90 @@
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_pages_recursive
+from linkcheck import check_links, page_targets, raise_for_broken, resolve_target, static_targets
+from profiling import Profiler
+from sitemap import SiteCollector
+
+class TestLinkCheck(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.write(os.path.join(self.static, "images", "a.png"), "")
+        self.write(os.path.join(self.content, "index.md"), "\n".join([
+            "# Home",
+            "",
+            "[post](/blog/post) [post again](/blog/post/#top) [away](https://example.org)",
+            "",
+            "![ok](/images/a.png) ![gone](/images/b.png)",
+            "",
+            "[nothing here](/blog/missing) [mail](mailto:me@example.org) [anchor](#top)",
+        ]))
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\n[home](../../) [sibling](../other)")
+
+    def test_resolve_target(self):
+        self.assertEqual(resolve_target("/a/b?x=1#y", "/"), "/a/b")
+        self.assertEqual(resolve_target("../c/", "/a/b/"), "/a/c/")
+        self.assertEqual(resolve_target("c.html", "/a/b.html"), "/a/c.html")
+        self.assertEqual(resolve_target("/images/my%20photo.png", "/"), "/images/my photo.png")
+        self.assertIsNone(resolve_target("https://example.org/", "/"))
+        self.assertIsNone(resolve_target("#top", "/"))
+
+    def test_targets(self):
+        self.assertEqual(page_targets(["/", "/a/"]), {"/", "/index.html", "/a/", "/a", "/a/index.html"})
+        self.assertEqual(static_targets(self.static), {"/images/a.png"})
+
+    def test_report(self):
+        site = SiteCollector()
+        profiler = Profiler()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            generate_pages_recursive(self.content, self.template, self.docs, "/base/", site=site)
+            broken = check_links(site, self.docs, self.static, profiler)
+        index = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.assertEqual(sorted(broken), sorted([
+            (index, 5, "image", "/images/b.png"),
+            (index, 7, "link", "/blog/missing"),
+            (post, 3, "link", "../other"),
+        ]))
+        self.assertIn(f"{index}:5: missing image /images/b.png", out.getvalue())
+        self.assertEqual(profiler.counters, {"links_checked": 7, "links_broken": 3})
+        with self.assertRaises(Exception):
+            raise_for_broken(broken)
+        raise_for_broken([])
+
+    def test_generated_files(self):
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\n[feed](/feed.xml) [index](/search/index.json)")
+        site = SiteCollector()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, self.docs, "/", site=site)
+            broken = check_links(site, self.docs, self.static, generated={"/feed.xml", "/search/index.json"})
+        self.assertEqual(sorted(url for _, _, _, url in broken), ["/blog/missing", "/images/b.png"])
+        self.assertEqual(static_targets(self.static, "/assets/"), {"/assets/images/a.png"})
+
+    def test_code_is_not_checked(self):
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "\n".join([
+            "# Post",
+            "",
+            "Write `[text](/nowhere)` for a link",
+            "",
+            "```",
+            "![img](/missing.png)",
+            "```",
+        ]))
+        site = SiteCollector()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, self.docs, "/", site=site)
+            broken = check_links(site, self.docs, self.static)
+        self.assertEqual(sorted(url for _, _, _, url in broken), ["/blog/missing", "/images/b.png"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming
+from minify import HtmlMinifier, Minifier, minify_css, minify_html, minify_static
+from parallel import generate_pages_parallel
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_whitespace_and_comments(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <!-- note -->\n    <title> Hi </title>\n  </head>\n</html>\n"
+        self.assertEqual(minify_html(html), "<!doctype html><html><head><title>Hi</title></head></html>")
+
+    def test_inline_spaces_are_kept(self):
+        html = "<p>Some   <b>bold</b>\n  <i>words</i> and <a href=\"/x\">a   link</a> </p>"
+        self.assertEqual(minify_html(html), "<p>Some <b>bold</b> <i>words</i> and <a href=\"/x\">a link</a></p>")
+
+    def test_pre_and_code_are_untouched(self):
+        html = "<div>\n  <pre><code>a  =  1\n\n    b</code></pre>\n  <p>x  <code>  y  </code></p>\n</div>"
+        self.assertEqual(minify_html(html), "<div><pre><code>a  =  1\n\n    b</code></pre><p>x <code>  y  </code></p></div>")
+
+    def test_conditional_comments_are_kept(self):
+        self.assertEqual(minify_html("<!--[if IE]><p>old</p><![endif]-->"), "<!--[if IE]><p>old</p><![endif]-->")
+
+    def test_any_chunking_gives_the_same_output(self):
+        html = "<div>\n  <p>one  <b>two</b></p>\n  <!-- c -->\n  <pre>  keep\n  this  </pre>\n  <p>end</p>\n</div>\n"
+        expected = minify_html(html)
+        for size in range(1, 12):
+            minifier = HtmlMinifier()
+            out = [minifier.feed(html[i:i + size]) for i in range(0, len(html), size)]
+            out.append(minifier.close())
+            self.assertEqual("".join(out), expected)
+
+    def test_css(self):
+        css = "/* theme */\nbody {\n  color: #fff;\n  font-family: \"A  B\", serif;\n}\n\na:hover , h1 > b { margin : 0 auto; }\n"
+        self.assertEqual(minify_css(css), 'body{color:#fff;font-family:"A  B",serif}a:hover,h1>b{margin :0 auto}')
+
+class TestMinifiedBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<html>\n  <body>\n    <h1>{{ Title }}</h1>\n    {{ Content }}\n  </body>\n</html>\n")
+        for name in ("a", "b"):
+            self.write(os.path.join(self.content, f"{name}.md"), f"# {name}\n\nSome **bold** text\n\n```\ncode  here\n\n  indented\n```")
+
+    def test_renderers_agree(self):
+        src = os.path.join(self.content, "a.md")
+        outputs = []
+        minifier = Minifier()
+        for render in (generate_page, generate_page_streaming):
+            dest = os.path.join(self.root, render.__name__, "a.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(src, self.template, dest, "/", minify=minifier)
+            outputs.append(self.read(dest))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn("<pre><code>code  here\n\n  indented</code></pre>", outputs[0])
+        self.assertTrue(outputs[0].startswith("<html><body><h1>a</h1><div><h1>a</h1><p>Some <b>bold</b> text</p>"))
+        self.assertEqual(minifier.stats["pages"], 2)
+        self.assertGreater(minifier.stats["bytes_before"], minifier.stats["bytes_after"])
+
+    def test_parallel_stats_and_static_css(self):
+        minifier = Minifier()
+        docs = os.path.join(self.root, "docs")
+        self.write(os.path.join(self.root, "index.css"), "body {\n  margin: 0;\n}\n")
+        os.makedirs(docs)
+        os.link(os.path.join(self.root, "index.css"), os.path.join(docs, "index.css"))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            minify_static(docs, minifier)
+            generate_pages_parallel(self.content, self.template, docs, "/", 2, minify=minifier)
+        self.assertEqual(minifier.stats["pages"], 3)
+        self.assertIn(f"Minified {os.path.join(docs, 'index.css')}: 22 -> 14 bytes, saved 8", out.getvalue())
+        self.assertEqual(self.read(os.path.join(docs, "index.css")), "body{margin:0}")
+        # The hard-linked source is not minified along with its copy
+        self.assertEqual(self.read(os.path.join(self.root, "index.css")), "body {\n  margin: 0;\n}\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming
+from output import forget_dirs, plan_dirs, prepare_output_dirs, replace_if_changed, temp_file, write_if_changed
+from profiling import Profiler
+
+class TestOutput(TempDirTestCase):
+    def tearDown(self):
+        forget_dirs(self.root)
+
+    def test_write_if_changed(self):
+        path = os.path.join(self.root, "page.html")
+        self.assertEqual(write_if_changed(path, b"<p>a</p>"), 8)
+        mtime = os.stat(path).st_mtime_ns
+        os.utime(path, ns=(mtime - 10**9, mtime - 10**9))
+        self.assertEqual(write_if_changed(path, b"<p>a</p>"), 0)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime - 10**9)
+        self.assertEqual(write_if_changed(path, b"<p>b</p>"), 8)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"<p>b</p>")
+        self.assertEqual(os.listdir(self.root), ["page.html"])
+
+    def test_replace_if_changed(self):
+        path = os.path.join(self.root, "page.html")
+        for data, written in ((b"old", 3), (b"old", 0), (b"newer", 5)):
+            f, tmp_path = temp_file(path)
+            with f:
+                f.write(data)
+            self.assertEqual(replace_if_changed(tmp_path, path), written)
+            self.assertFalse(os.path.exists(tmp_path))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"newer")
+
+    def test_output_mode(self):
+        path = os.path.join(self.root, "page.html")
+        umask = os.umask(0)
+        os.umask(umask)
+        # A new file gets what open() would give it, not mkstemp's 0600
+        write_if_changed(path, b"<p>a</p>")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~umask)
+        os.chmod(path, 0o640)
+        f, tmp_path = temp_file(path)
+        with f:
+            f.write(b"<p>b</p>")
+        replace_if_changed(tmp_path, path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+    def test_plan_dirs(self):
+        paths = [os.path.join("docs", "a", "b", "index.html"), os.path.join("docs", "a", "index.html"), os.path.join("docs", "c", "x.html")]
+        self.assertEqual(
+            plan_dirs(paths),
+            ["docs", os.path.join("docs", "a"), os.path.join("docs", "c"), os.path.join("docs", "a", "b")],
+        )
+
+    def test_dirs_are_created_once(self):
+        docs = os.path.join(self.root, "docs")
+        pages = [("a.md", os.path.join(docs, "a", "index.html")), ("b.md", os.path.join(docs, "a", "b", "index.html"))]
+        profiler = Profiler()
+        prepare_output_dirs(pages, profiler)
+        counters = dict(profiler.counters)
+        prepare_output_dirs(pages, profiler)
+        self.assertTrue(os.path.isdir(os.path.join(docs, "a", "b")))
+        self.assertEqual(counters["mkdir_calls"], 3)
+        self.assertEqual(profiler.counters, counters)
+
+    def test_write_after_folder_removed(self):
+        src = os.path.join(self.root, "index.md")
+        template = os.path.join(self.root, "template.html")
+        self.write(src, "# Title")
+        self.write(template, "{{ Title }}")
+        dest = os.path.join(self.root, "docs", "index.html")
+        profiler = Profiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(src, template, dest, "/", profiler=profiler)
+            generate_page(src, template, dest, "/", profiler=profiler)
+            self.assertEqual(profiler.counters, {"bytes_read": 14, "bytes_written": 5, "makedirs_calls": 1, "makedirs_saved": 1, "pages_written": 1, "pages_unchanged": 1})
+            os.remove(dest)
+            os.rmdir(os.path.dirname(dest))
+            generate_page(src, template, dest, "/")
+        self.assertEqual(self.read(dest), "Title")
+
+    def test_pages_report_unchanged_writes(self):
+        src = os.path.join(self.root, "index.md")
+        template = os.path.join(self.root, "template.html")
+        self.write(src, "# Title\n\ntext")
+        self.write(template, "{{ Title }}{{ Content }}")
+        for render in (generate_page, generate_page_streaming):
+            profiler = Profiler()
+            dest = os.path.join(self.root, render.__name__, "index.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(src, template, dest, "/", profiler=profiler)
+                render(src, template, dest, "/", profiler=profiler)
+            self.assertEqual(profiler.counters["pages_written"], 1)
+            self.assertEqual(profiler.counters["pages_unchanged"], 1)
+            self.assertEqual(profiler.counters["bytes_written"], os.path.getsize(dest))
+            self.assertEqual(os.listdir(os.path.dirname(dest)), ["index.html"])
+
+if __name__ == '__main__':
+    unittest.main()
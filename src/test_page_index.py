@@ -0,0 +1,80 @@
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import find_pages
+from page_index import Page, is_page, page_dest, scan_pages
+
+class TestPageIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = self.root
+        for path in (
+            "index.md",
+            "blog/post/index.md",
+            "blog/post/photo.png",
+            ".DS_Store",
+            "blog/.hidden/index.md",
+            "blog/_drafts/index.md",
+            "blog/post/index.md~",
+        ):
+            self.write(os.path.join(self.content, path), "# Title")
+
+    def test_only_markdown_pages(self):
+        index = scan_pages(self.content, "docs")
+        self.assertEqual(
+            sorted(index.pairs()),
+            [
+                (os.path.join(self.content, "blog", "post", "index.md"), os.path.join("docs", "blog", "post", "index.html")),
+                (os.path.join(self.content, "index.md"), os.path.join("docs", "index.html")),
+            ],
+        )
+        self.assertEqual(sorted(find_pages(self.content, "docs")), sorted(index.pairs()))
+
+    def test_records_size_and_mtime(self):
+        src = os.path.join(self.content, "index.md")
+        page = scan_pages(self.content, "docs").get(src)
+        stat = os.stat(src)
+        self.assertEqual(page, Page(src, os.path.join("docs", "index.html"), stat.st_size, stat.st_mtime_ns))
+        self.assertIsNone(scan_pages(self.content, "docs").get("missing.md"))
+
+    def test_custom_filters(self):
+        index = scan_pages(self.content, "docs", extensions=(".md", ".png"), ignore=())
+        self.assertEqual(len(index), 5)
+        self.assertIn(os.path.join(self.content, "blog", "post", "photo.png"), index.by_src)
+
+    def test_front_matter_is_cached(self):
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.write(post, "---\ntitle: Post\ndate: 2024-05-01\ntags: [a, b]\n---\n# Heading\n")
+        cache = os.path.join(self.root, "page-meta.json")
+        index = scan_pages(self.content, "docs").load_meta(cache)
+        self.assertEqual(index.get(post).meta, {"title": "Post", "date": "2024-05-01", "tags": ["a", "b"]})
+        self.assertEqual(index.get(post).header_lines, 5)
+        self.assertEqual(index.get(os.path.join(self.content, "index.md")).meta, {"title": "Title"})
+        self.assertEqual(index.dated(), [index.get(post)])
+        self.assertEqual(index.dated(os.path.join(self.content, "other")), [])
+        self.assertEqual(index.tags(), {"a": [index.get(post)], "b": [index.get(post)]})
+        # Same size and mtime: the cached metadata is trusted without reading the header
+        stat = os.stat(post)
+        self.write(post, "---\ntitle: Tsop\ndate: 2024-05-01\ntags: [a, b]\n---\n# Heading\n")
+        os.utime(post, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(scan_pages(self.content, "docs").load_meta(cache).get(post).meta["title"], "Post")
+        self.assertEqual(scan_pages(self.content, "docs").load_meta().get(post).meta["title"], "Tsop")
+
+    def test_drafts_are_not_published(self):
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        self.write(post, "---\ndraft: true\n---\n# Draft\n")
+        index = scan_pages(self.content, "docs").load_meta()
+        self.assertTrue(index.get(post).is_draft())
+        self.assertEqual(index.published().pairs(), [(os.path.join(self.content, "index.md"), os.path.join("docs", "index.html"))])
+        self.assertEqual(find_pages(self.content, "docs"), index.published().pairs())
+
+    def test_names(self):
+        self.assertTrue(is_page("post.md"))
+        self.assertFalse(is_page(".post.md"))
+        self.assertFalse(is_page("post.md.swp"))
+        self.assertEqual(page_dest("post.md"), "post.html")
+        self.assertEqual(page_dest("my.md.notes.md"), "my.md.notes.html")
+
+if __name__ == '__main__':
+    unittest.main()
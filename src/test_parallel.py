@@ -0,0 +1,45 @@
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import SAMPLE_TEMPLATE, TempDirTestCase, write_sample_site
+from functions import generate_pages_recursive
+from parallel import generate_pages_parallel, render_pages
+
+class TestParallelBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, SAMPLE_TEMPLATE)
+        write_sample_site(self.content, 6)
+
+    def test_output_matches_serial_build(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/base/")
+            generate_pages_parallel(self.content, self.template, parallel, "/base/", jobs=3)
+        self.assertEqual(len(self.read_tree(parallel)), 6)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_page_errors_are_reported(self):
+        self.write(os.path.join(self.content, "broken.md"), "no title here")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with self.assertRaises(Exception) as cm:
+                generate_pages_parallel(self.content, self.template, os.path.join(self.root, "docs"), "/", jobs=2)
+        self.assertIn("1 page(s) failed to render", str(cm.exception))
+        self.assertIn("broken.md: Markdown has to have a title", out.getvalue())
+        self.assertEqual(len(self.read_tree(os.path.join(self.root, "docs"))), 6)
+
+    def test_serial_fallback_collects_failures(self):
+        pages = [(os.path.join(self.root, "missing.md"), os.path.join(self.root, "missing.html"))]
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = render_pages(pages, self.template, "/", jobs=1)
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0][0], pages[0][0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import asyncio
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import SAMPLE_TEMPLATE, TempDirTestCase, write_sample_site
+from functions import generate_pages_recursive
+from pipeline import generate_pages_pipeline, run_pipeline
+from profiling import Profiler
+
+class TestPipelineBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, SAMPLE_TEMPLATE)
+        write_sample_site(self.content, 8)
+
+    def test_output_matches_serial_build(self):
+        serial = os.path.join(self.root, "serial")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, serial, "/base/")
+        expected = self.read_tree(serial)
+        self.assertEqual(len(expected), 8)
+        # One slot per queue forces every stage to wait on the next one
+        for io_workers, jobs, queue_size in ((1, 1, 1), (4, 1, 16), (2, 2, 1)):
+            dest = os.path.join(self.root, f"pipeline-{io_workers}-{jobs}-{queue_size}")
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_pipeline(self.content, self.template, dest, "/base/", io_workers, jobs, queue_size)
+            self.assertEqual(self.read_tree(dest), expected)
+
+    def test_page_errors_are_reported(self):
+        self.write(os.path.join(self.content, "broken.md"), "no title here")
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            with self.assertRaises(Exception) as cm:
+                generate_pages_pipeline(self.content, self.template, os.path.join(self.root, "docs"), "/", queue_size=1)
+        self.assertIn("1 page(s) failed to render", str(cm.exception))
+        self.assertIn("broken.md: Markdown has to have a title", out.getvalue())
+        self.assertEqual(len(self.read_tree(os.path.join(self.root, "docs"))), 8)
+
+    def test_missing_source_and_profile(self):
+        pages = [
+            (os.path.join(self.root, "missing.md"), os.path.join(self.root, "missing.html")),
+            (os.path.join(self.content, "section0", "page0", "index.md"), os.path.join(self.root, "page0.html")),
+        ]
+        profiler = Profiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = asyncio.run(run_pipeline(pages, self.template, "/", profiler=profiler))
+        self.assertEqual([src for src, _ in failures], [pages[0][0]])
+        self.assertEqual(list(profiler.pages), [pages[1][0]])
+        self.assertEqual(profiler.counters["bytes_written"], os.path.getsize(pages[1][1]))
+        self.assertTrue({"read", "parse", "template", "write"} <= set(profiler.stages))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import contextlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_page
+from parallel import generate_pages_parallel
+from profiling import NULL_PROFILER, Profiler
+
+class TestProfiler(unittest.TestCase):
+    def test_stages_and_hooks(self):
+        calls = []
+        profiler = Profiler(hooks=[lambda stage, page, seconds: calls.append((stage, page))])
+        with profiler.stage("parse", "a.md"):
+            pass
+        with profiler.stage("parse", "b.md"):
+            pass
+        profiler.count("bytes_read", 10)
+        profiler.count("bytes_read", 5)
+        self.assertEqual(list(profiler.stages), ["parse"])
+        self.assertEqual(profiler.counters, {"bytes_read": 15})
+        self.assertEqual(calls, [("parse", "a.md"), ("parse", "b.md")])
+
+    def test_merge_and_pickle(self):
+        calls = []
+        worker = Profiler(hooks=[lambda stage, page, seconds: calls.append((stage, page, seconds))])
+        worker.record("write", "a.md", 0.5)
+        self.assertEqual(calls, [("write", "a.md", 0.5)])
+        worker.count("bytes_written", 3)
+        worker.page("a.md", 0.75)
+        worker = pickle.loads(pickle.dumps(worker))
+        self.assertEqual(worker.hooks, [])
+        profiler = Profiler()
+        profiler.merge(worker)
+        profiler.merge(worker)
+        self.assertEqual(profiler.stages, {"write": 1.0})
+        self.assertEqual(profiler.counters, {"bytes_written": 6})
+        self.assertEqual(profiler.pages, {"a.md": 0.75})
+
+    def test_report_and_json(self):
+        profiler = Profiler()
+        profiler.page("slow.md", 2.0)
+        profiler.page("fast.md", 1.0)
+        profiler.record("parse", None, 3.0)
+        data = profiler.finish().to_dict(top=1)
+        self.assertEqual(data["pages"], 2)
+        self.assertEqual(data["slowest_pages"], [{"page": "slow.md", "seconds": 2.0}])
+        self.assertIn("slow.md", profiler.report())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            profiler.write_json(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["stages"], {"parse": 3.0})
+
+    def test_null_profiler(self):
+        with NULL_PROFILER.stage("parse"):
+            NULL_PROFILER.count("bytes_read", 1)
+
+class TestProfiledBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        for name in ("a", "b", "c"):
+            self.write(os.path.join(self.content, f"{name}.md"), f"# {name}\n\ntext")
+
+    def test_generate_page_stages(self):
+        profiler = Profiler()
+        src = os.path.join(self.content, "a.md")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_page(src, self.template, os.path.join(self.root, "docs", "a.html"), "/", profiler=profiler)
+        self.assertEqual(set(profiler.stages), {"read", "parse", "serialize", "template", "write"})
+        self.assertEqual(profiler.counters["bytes_read"], os.path.getsize(src))
+        self.assertEqual(profiler.counters["bytes_written"], len("a<div><h1>a</h1><p>text</p></div>"))
+        self.assertIn(src, profiler.pages)
+
+    def test_parallel_profiles_are_merged(self):
+        profiler = Profiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_parallel(self.content, self.template, os.path.join(self.root, "docs"), "/", 2, profiler=profiler)
+        self.assertEqual(len(profiler.pages), 3)
+        self.assertIn("discover", profiler.stages)
+        self.assertIn("parse", profiler.stages)
+
+if __name__ == '__main__':
+    unittest.main()
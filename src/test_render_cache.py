@@ -0,0 +1,89 @@
+import contextlib
+import io
+import os
+import pickle
+import tempfile
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming
+from parallel import generate_pages_parallel
+from render_cache import BlockCache, get_block_cache
+
+class TestBlockCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = BlockCache(max_entries=2)
+        cache.put("a", "<p>a</p>")
+        cache.put("b", "<p>b</p>")
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+        cache.put("c", "<p>c</p>")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "<p>c</p>")
+        self.assertEqual(cache.stats, {"hits": 2, "disk_hits": 0, "misses": 1})
+
+    def test_key_depends_on_salt(self):
+        cache = BlockCache()
+        self.assertEqual(cache.key("text", "/"), cache.key("text", "/"))
+        self.assertNotEqual(cache.key("text", "/"), cache.key("text", "/base/"))
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = BlockCache(disk_dir=tmp)
+            key = first.key("text")
+            first.put(key, "<p>text</p>")
+            second = BlockCache(disk_dir=tmp)
+            self.assertEqual(second.get(key), "<p>text</p>")
+            self.assertEqual(second.get(key), "<p>text</p>")
+            self.assertEqual(second.take_stats(), {"hits": 1, "disk_hits": 1, "misses": 0})
+            self.assertEqual(second.stats, {"hits": 0, "disk_hits": 0, "misses": 0})
+
+    def test_disk_only(self):
+        # --block-cache 0 --block-cache-dir keeps nothing in memory
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = BlockCache(max_entries=0, disk_dir=tmp)
+            cache.put("ab12", "<p>a</p>")
+            self.assertEqual(len(cache.entries), 0)
+            self.assertEqual(cache.get("ab12"), "<p>a</p>")
+            self.assertEqual(cache.stats, {"hits": 0, "disk_hits": 1, "misses": 0})
+
+    def test_pickle_gives_process_cache(self):
+        cache = get_block_cache(8)
+        self.assertIs(pickle.loads(pickle.dumps(cache)), cache)
+        self.assertIsNot(get_block_cache(9), cache)
+
+    def test_summary(self):
+        cache = BlockCache()
+        cache.add_stats({"hits": 3, "disk_hits": 0, "misses": 1})
+        self.assertEqual(cache.summary(), "Block cache: 3 memory hits, 0 disk hits, 1 misses (75.0% hit rate)")
+
+class TestCachedBuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, '<a href="/">{{ Title }}</a>{{ Content }}')
+        for name in ("a", "b", "c"):
+            self.write(os.path.join(self.content, f"{name}.md"), f"# {name}\n\nShared [link](/x) and ![img](/i.png)\n\n```\ncode\n\nmore\n```\n\n- one\n- two")
+
+    def test_cached_output_matches(self):
+        src = os.path.join(self.content, "a.md")
+        cache = BlockCache()
+        for render in (generate_page, generate_page_streaming):
+            plain = os.path.join(self.root, "plain.html")
+            cached = os.path.join(self.root, "cached.html")
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(src, self.template, plain, "/base/")
+                render(src, self.template, cached, "/base/", cache=cache)
+                render(src, self.template, cached, "/base/", cache=cache)
+            self.assertEqual(self.read(plain), self.read(cached))
+        self.assertGreater(cache.stats["hits"], 0)
+
+    def test_parallel_stats_are_merged(self):
+        cache = get_block_cache(16)
+        cache.take_stats()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_parallel(self.content, self.template, os.path.join(self.root, "docs"), "/", 2, cache=cache)
+        self.assertEqual(sum(cache.stats.values()), 12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming, generate_pages_recursive
+from incremental import generate_pages_incremental
+from page_index import page_url
+from parallel import generate_pages_parallel
+from pipeline import generate_pages_pipeline
+from profiling import NULL_PROFILER, Profiler
+from render_cache import BlockCache
+from search_index import DEFAULT_MAX_POSTINGS, SearchIndex, decode_postings, encode_postings, shard_name
+
+class TestSearchIndex(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.out_dir = os.path.join(self.docs, "search")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        texts = [
+            "# Hello World\n\nThe **quick** fox and a [link text](/x)\n\n```\nhello code\n```",
+            "# Second\n\n- hello\n- again ![alt words](/i.png)",
+            "---\ntitle: Café\n---\n# Heading\n\nhello café",
+        ]
+        for i, text in enumerate(texts):
+            self.write(os.path.join(self.content, f"page{i}", "index.md"), text)
+
+    def build(self, builder=generate_pages_recursive, *args, out_dir=None, max_postings=None, profiler=NULL_PROFILER, **options):
+        search = SearchIndex(self.docs, "/base/", out_dir or self.out_dir, max_postings or DEFAULT_MAX_POSTINGS)
+        with contextlib.redirect_stdout(io.StringIO()):
+            builder(self.content, self.template, self.docs, "/base/", *args, search=search, **options)
+            return search.write(profiler)
+
+    def load(self, out_dir=None):
+        out_dir = out_dir or self.out_dir
+        meta = json.loads(self.read(os.path.join(out_dir, "index.json")))
+        terms = {}
+        for shard in meta["shards"].values():
+            terms.update(json.loads(self.read(os.path.join(out_dir, shard["file"]))))
+        return meta, terms
+
+    def test_words_from_every_renderer(self):
+        src = os.path.join(self.content, "page0", "index.md")
+        expected = ["hello", "world", "the", "quick", "fox", "and", "a", "link", "text", "hello", "code"]
+        cache = BlockCache()
+        for render, options in (
+            (generate_page, {}),
+            (generate_page_streaming, {}),
+            (generate_page, {"cache": cache}),
+            # The second time every block comes from the cache
+            (generate_page, {"cache": cache}),
+        ):
+            # Without a plan, as in a worker, the page waits to be taken
+            search = SearchIndex(self.docs)
+            with contextlib.redirect_stdout(io.StringIO()):
+                render(src, self.template, os.path.join(self.root, "out.html"), "/", search=search, **options)
+            self.assertEqual(search.take_pages(), {src: ["Hello World", expected]})
+        self.assertEqual(cache.stats["hits"], 3)
+
+    def test_every_build_mode_gives_same_index(self):
+        self.build()
+        expected = self.load()
+        for builder, args in ((generate_pages_parallel, (2,)), (generate_pages_recursive, (generate_page_streaming,))):
+            self.build(builder, *args)
+            self.assertEqual(self.load(), expected)
+        self.build(generate_pages_pipeline, jobs=2)
+        self.assertEqual(self.load(), expected)
+
+    def test_incremental_reuses_previous_index(self):
+        manifest = os.path.join(self.root, "manifest.json")
+        self.build()
+        expected = self.load()
+        rendered = []
+
+        def render(src, *args, **options):
+            rendered.append(src)
+            generate_page(src, *args, **options)
+
+        for _ in range(3):
+            self.build(generate_pages_incremental, manifest, render=render)
+            self.assertEqual(self.load(), expected)
+        # The first incremental build renders everything, the ones after it nothing
+        self.assertEqual(len(rendered), 3)
+        # Words are not kept in the manifest
+        self.assertNotIn("hello", self.read(manifest))
+
+        changed = os.path.join(self.content, "page1", "index.md")
+        self.write(changed, "# Second\n\n- goodbye\n- again")
+        rendered.clear()
+        self.build(generate_pages_incremental, manifest, render=render)
+        self.assertEqual(rendered, [changed])
+        meta, terms = self.load()
+        self.assertEqual(decode_postings(terms["hello"]), [(0, [0, 9]), (2, [1])])
+        self.assertEqual(decode_postings(terms["goodbye"]), [(1, [1])])
+        self.assertNotIn("alt", terms)
+        self.assertEqual(meta["pages"], expected[0]["pages"])
+
+        # Without the previous index there is nothing to copy, every page is rendered
+        rendered.clear()
+        os.remove(os.path.join(self.out_dir, "index.json"))
+        self.build(generate_pages_incremental, manifest, render=render)
+        self.assertEqual(len(rendered), 3)
+        self.assertEqual(self.load()[1], terms)
+
+    def test_postings_round_trip(self):
+        postings = [(0, [1, 5, 9]), (3, [0]), (10, [2, 4])]
+        ints = encode_postings(postings)
+        self.assertEqual(ints, [0, 3, 1, 4, 4, 3, 1, 0, 7, 2, 2, 2])
+        self.assertEqual(decode_postings(ints), postings)
+
+    def test_index(self):
+        stats = self.build()
+        meta, terms = self.load()
+        self.assertEqual(meta["pages"][0], ["/base/page0/", "Hello World"])
+        self.assertEqual(stats["pages"], 3)
+        self.assertEqual(decode_postings(terms["hello"]), [(0, [0, 9]), (1, [1]), (2, [1])])
+        # The title comes from the front matter, the words from the body alone
+        self.assertEqual(meta["pages"][2], ["/base/page2/", "Café"])
+        self.assertEqual(decode_postings(terms["café"]), [(2, [2])])
+        self.assertIn("alt", terms)
+        self.assertIn(shard_name("café"), meta["shards"])
+
+    def test_spilled_runs_give_same_index(self):
+        one = os.path.join(self.root, "one")
+        spilled = os.path.join(self.root, "spilled")
+        self.build(out_dir=one)
+        profiler = Profiler()
+        self.build(generate_pages_parallel, 2, out_dir=spilled, max_postings=1, profiler=profiler)
+        # Every page spilled a run as it came back, before the index was written
+        self.assertEqual(profiler.counters["search_spilled_runs"], 3)
+        self.assertEqual(self.load(one), self.load(spilled))
+
+    def test_stale_shards_are_removed(self):
+        self.build()
+        for i in (0, 2):
+            os.remove(os.path.join(self.content, f"page{i}", "index.md"))
+        self.build()
+        meta, terms = self.load()
+        self.assertEqual(sorted(os.listdir(self.out_dir)), sorted(["index.json"] + [s["file"] for s in meta["shards"].values()]))
+        self.assertNotIn("fox", terms)
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join("docs", "index.html"), "docs", "/b/"), "/b/")
+        self.assertEqual(page_url(os.path.join("docs", "a", "index.html"), "docs", "/"), "/a/")
+        self.assertEqual(page_url(os.path.join("docs", "a", "post.html"), "docs", "/"), "/a/post.html")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import contextlib
+import io
+import json
+import os
+import pickle
+import unittest
+from xml.etree import ElementTree
+
+from fixtures import TempDirTestCase
+from functions import generate_page, generate_page_streaming, generate_pages_recursive
+from incremental import generate_pages_incremental
+from parallel import generate_pages_parallel, worker_option
+from pipeline import generate_pages_pipeline
+from render_cache import BlockCache
+from sitemap import SiteCollector, write_site_files
+
+class TestSiteFiles(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "{{ Title }}{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nRead [the post](/blog/first) or [away](https://example.org)")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n[first](/blog/first/)")
+        self.write(os.path.join(self.content, "blog", "first", "index.md"), "# First & best\n\nBack [home](/)")
+        self.write(os.path.join(self.content, "blog", "second", "index.md"), "# Second\n\nNo links")
+        old = os.path.join(self.content, "blog", "first", "index.md")
+        os.utime(old, (1700000000, 1700000000))
+
+    def build(self, builder, *args, **options):
+        site = SiteCollector()
+        with contextlib.redirect_stdout(io.StringIO()):
+            builder(self.content, self.template, self.docs, "/base/", *args, site=site, **options)
+        return site
+
+    def test_collects_while_rendering(self):
+        site = self.build(generate_pages_recursive)
+        entry = site.pages[os.path.join(self.content, "blog", "first", "index.md")]
+        self.assertEqual(entry["title"], "First & best")
+        self.assertEqual(entry["links"], [["/", 3]])
+        self.assertEqual(entry["images"], [])
+        self.assertEqual(entry["mtime"], 1700000000)
+        self.assertEqual(self.build(generate_pages_parallel, 2).pages, site.pages)
+        self.assertEqual(self.build(generate_pages_recursive, render=generate_page_streaming).pages, site.pages)
+
+    def test_references_come_from_the_parser(self):
+        # A link wrapped across lines is found, the link in a code sample is not
+        self.write(os.path.join(self.content, "blog", "second", "index.md"), "\n".join([
+            "# Second",
+            "",
+            "See [the first",
+            "post](/blog/first) and ![a",
+            "picture](/a.png)",
+            "",
+            "```",
+            "[sample](/sample)",
+            "```",
+            "",
+            "- `[code](/code)` [home](/)",
+        ]))
+        src = os.path.join(self.content, "blog", "second", "index.md")
+        site = self.build(generate_pages_recursive)
+        self.assertEqual(site.pages[src]["links"], [["/blog/first", 3], ["/", 11]])
+        self.assertEqual(site.pages[src]["images"], [["/a.png", 3]])
+        self.assertEqual(self.build(generate_pages_recursive, render=generate_page_streaming).pages, site.pages)
+        cache = BlockCache()
+        for _ in range(2):
+            # The second time the blocks come from the cache
+            self.assertEqual(self.build(generate_pages_recursive, cache=cache).pages, site.pages)
+        self.assertTrue(cache.stats["hits"])
+        self.assertEqual(self.build(generate_pages_pipeline, jobs=2).pages, site.pages)
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_site_files(site, self.content, self.docs, "/base/")
+        graph = json.loads(self.read(os.path.join(self.docs, "links.json")))
+        self.assertEqual(graph["/base/blog/second/"]["links"], ["/base/blog/first", "/base/"])
+
+    def test_incremental_replays_unchanged_pages(self):
+        manifest = os.path.join(self.root, "manifest.json")
+        first = self.build(generate_pages_incremental, manifest_path=manifest)
+        rendered = []
+
+        def render(src, *args, **options):
+            rendered.append(src)
+            generate_page(src, *args, **options)
+
+        for _ in range(2):
+            # The replayed entries stay in the manifest, so the third build renders nothing either
+            again = self.build(generate_pages_incremental, manifest_path=manifest, render=render)
+            self.assertEqual(first.pages, again.pages)
+        self.assertEqual(rendered, [])
+        self.assertEqual(len(again.pages), 4)
+
+    def test_site_files(self):
+        site = self.build(generate_pages_recursive)
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_site_files(site, self.content, self.docs, "/base/", "https://example.com/")
+        namespace = {"s": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+        sitemap = ElementTree.parse(os.path.join(self.docs, "sitemap.xml"))
+        self.assertEqual(
+            [loc.text for loc in sitemap.findall("s:url/s:loc", namespace)],
+            ["https://example.com/base/", "https://example.com/base/blog/", "https://example.com/base/blog/first/", "https://example.com/base/blog/second/"],
+        )
+        feed = ElementTree.parse(os.path.join(self.docs, "feed.xml"))
+        self.assertEqual([title.text for title in feed.findall("channel/item/title")], ["Second", "First & best"])
+        graph = json.loads(self.read(os.path.join(self.docs, "links.json")))
+        self.assertEqual(graph["/base/"]["links"], ["/base/blog/first", "https://example.org"])
+        self.assertEqual(graph["/base/blog/first/"]["inbound"], ["/base/", "/base/blog/"])
+
+    def test_front_matter_date_and_drafts(self):
+        self.write(os.path.join(self.content, "blog", "third", "index.md"), "---\ntitle: Third\ndate: 2001-02-03\n---\n# Heading\n\n[home](/)")
+        self.write(os.path.join(self.content, "blog", "draft", "index.md"), "---\ndraft: true\n---\n# Draft")
+        site = self.build(generate_pages_recursive)
+        entry = site.pages[os.path.join(self.content, "blog", "third", "index.md")]
+        self.assertEqual((entry["title"], entry["date"], entry["links"]), ("Third", "2001-02-03", [["/", 7]]))
+        self.assertEqual(self.build(generate_pages_recursive, render=generate_page_streaming).pages, site.pages)
+        self.assertNotIn(os.path.join(self.content, "blog", "draft", "index.md"), site.pages)
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_site_files(site, self.content, self.docs, "/base/")
+        feed = ElementTree.parse(os.path.join(self.docs, "feed.xml"))
+        self.assertEqual([title.text for title in feed.findall("channel/item/title")], ["Second", "First & best", "Third"])
+        self.assertEqual(feed.findall("channel/item/pubDate")[2].text, "Sat, 03 Feb 2001 00:00:00 +0000")
+
+    def test_pickle_gives_process_collector(self):
+        self.assertIs(pickle.loads(pickle.dumps(SiteCollector())), worker_option(SiteCollector))
+        worker = worker_option(SiteCollector)
+        worker.add_entry("a.md", {"dest": "a.html"})
+        parent = SiteCollector()
+        parent.add_pages(worker.take_pages())
+        self.assertEqual(parent.pages, {"a.md": {"dest": "a.html"}})
+        self.assertEqual(worker.pages, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import os
+import unittest
+
+from fixtures import TempDirTestCase
+from sync import sync_files
+
+class TestSyncFiles(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.manifest = os.path.join(self.root, "static-manifest.json")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def sync(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sync_files(self.static, self.dest, manifest_path=self.manifest, **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        stats = self.sync()
+        self.assertEqual(stats, {"copied": 2, "linked": 0, "unchanged": 0, "removed": 0})
+        self.assertEqual(self.read(os.path.join(self.dest, "images", "a.png")), "png")
+
+    def test_second_sync_copies_nothing(self):
+        self.sync()
+        stats = self.sync()
+        self.assertEqual(stats, {"copied": 0, "linked": 0, "unchanged": 2, "removed": 0})
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        path = os.path.join(self.static, "index.css")
+        self.write(path, "body { color: red }")
+        stats = self.sync()
+        self.assertEqual(stats["copied"], 1)
+        self.assertEqual(stats["unchanged"], 1)
+
+    def test_checksum_ignores_mtime(self):
+        self.sync()
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 0))
+        self.assertEqual(self.sync(checksum=True)["copied"], 0)
+        self.assertEqual(self.sync()["copied"], 1)
+
+    def test_stale_file_removed_but_pages_kept(self):
+        self.sync()
+        page = os.path.join(self.dest, "index.html")
+        self.write(page, "<html></html>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        stats = self.sync()
+        self.assertEqual(stats["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "a.png")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_hardlink(self):
+        stats = self.sync(link="hard")
+        self.assertEqual(stats["linked"], 2)
+        src = os.stat(os.path.join(self.static, "index.css"))
+        dest = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(src.st_ino, dest.st_ino)
+        self.assertEqual(self.sync(link="hard")["unchanged"], 2)
+
+    def test_reflink_falls_back_to_copy(self):
+        stats = self.sync(link="reflink")
+        self.assertEqual(stats["linked"] + stats["copied"], 2)
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body {}")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import os
+import unittest
+
+from fixtures import TempDirTestCase, write_file
+from template import compile_template, load_template
+
+class TestCompileTemplate(unittest.TestCase):
+    def test_slots(self):
+        template = compile_template("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.assertEqual(template.parts, ["<title>", "Title", "</title><body>", "Content", "</body>"])
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>text</p>"}),
+            "<title>Hi</title><body><p>text</p></body>",
+        )
+
+    def test_basepath_only_rewrites_template(self):
+        template = compile_template('<link href="/index.css"><img src="/logo.png">{{ Content }}', "/site/")
+        html = template.render({"Content": '<code>href="/raw"</code>'})
+        self.assertEqual(html, '<link href="/site/index.css"><img src="/site/logo.png"><code>href="/raw"</code>')
+
+    def test_values_are_not_reparsed(self):
+        template = compile_template("<title>{{ Title }}</title>{{ Content }}")
+        html = template.render({"Title": "{{ Content }}", "Content": "body"})
+        self.assertEqual(html, "<title>{{ Content }}</title>body")
+
+    def test_unknown_slot_is_kept(self):
+        template = compile_template("{{ Title }} {{ Footer }}")
+        self.assertEqual(template.render({"Title": "Hi"}), "Hi {{ Footer }}")
+
+    def test_stream_chunks(self):
+        template = compile_template("<title>{{ Title }}</title>{{ Content }}<footer>")
+        out = io.StringIO()
+        template.stream(out, {"Title": "Hi", "Content": iter(["<p>", "a", "</p>"])})
+        self.assertEqual(out.getvalue(), "<title>Hi</title><p>a</p><footer>")
+
+class TestLoadTemplate(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.root, "template.html")
+        self.write_at("<h1>{{ Title }}</h1>", 1_000_000_000)
+
+    def write_at(self, text, mtime_ns):
+        write_file(self.path, text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_cached_until_mtime_changes(self):
+        first = load_template(self.path)
+        self.assertIs(load_template(self.path), first)
+        self.write_at("<h2>{{ Title }}</h2>", 2_000_000_000)
+        second = load_template(self.path)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.render({"Title": "Hi"}), "<h2>Hi</h2>")
+
+    def test_cached_per_basepath(self):
+        self.write_at('<a href="/">{{ Title }}</a>', 3_000_000_000)
+        self.assertEqual(load_template(self.path, "/").render({"Title": "x"}), '<a href="/">x</a>')
+        self.assertEqual(load_template(self.path, "/blog/").render({"Title": "x"}), '<a href="/blog/">x</a>')
+
+if __name__ == '__main__':
+    unittest.main()
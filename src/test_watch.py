@@ -0,0 +1,140 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import urllib.request
+from unittest import mock
+
+from fixtures import TempDirTestCase, write_file
+from page_index import scan_pages
+from watch import (
+    InotifyWatcher,
+    LiveReloadHandler,
+    PollingWatcher,
+    Reloader,
+    dest_for,
+    inject_livereload,
+    page_templates,
+    rebuild,
+    serve,
+    LIVERELOAD_SCRIPT,
+)
+
+class TestWatchers(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.folder = os.path.join(self.root, "content")
+        os.makedirs(self.folder)
+        self.page = os.path.join(self.folder, "index.md")
+        self.write(self.page, "# Home")
+
+    def test_polling_reports_changes_and_deletes(self):
+        watcher = PollingWatcher([self.folder])
+        self.assertEqual(watcher.poll(), set())
+        new_page = os.path.join(self.folder, "new.md")
+        self.write(new_page, "# New")
+        self.assertEqual(watcher.poll(), {new_page})
+        os.remove(self.page)
+        self.assertEqual(watcher.wait(timeout=0), {self.page})
+
+    def test_inotify_reports_changes(self):
+        try:
+            watcher = InotifyWatcher([self.folder])
+        except OSError:
+            self.skipTest("inotify is not available")
+        try:
+            os.makedirs(os.path.join(self.folder, "blog"))
+            self.assertEqual(watcher.wait(timeout=1), set())
+            post = os.path.join(self.folder, "blog", "post.md")
+            self.write(post, "# Post")
+            self.assertIn(post, watcher.wait(timeout=1))
+        finally:
+            watcher.close()
+
+class TestRebuild(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(self.static)
+        self.write(self.template, "{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+
+    def rebuild(self, changed):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return rebuild(changed, self.content, self.template, self.static, self.dest)
+
+    def test_dest_for(self):
+        self.assertEqual(
+            dest_for(os.path.join("content", "blog", "post.md"), "content", "docs"),
+            os.path.join("docs", "blog", "post.html"),
+        )
+
+    def test_only_changed_page(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.assertEqual(self.rebuild({post, post + ".swp"}), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_template_rebuilds_everything(self):
+        self.assertEqual(self.rebuild({self.template}), 2)
+
+    def test_deleted_page_is_removed(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.rebuild({post})
+        os.remove(post)
+        self.assertEqual(self.rebuild({post}), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_draft_output_is_removed(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.rebuild({post})
+        self.write(post, "---\ndraft: true\n---\n# Post")
+        self.assertEqual(self.rebuild({post}), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "post.html")))
+
+    def test_front_matter_template(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        alt = os.path.join(self.root, "alt.html")
+        self.write(alt, "<main>{{ Content }}</main>")
+        self.write(post, "---\ntemplate: alt.html\n---\n# Post")
+        index = scan_pages(self.content, self.dest).load_meta()
+        self.assertEqual(page_templates(index, self.template), [alt, self.template])
+        self.assertEqual(self.rebuild({alt}), 1)
+        self.assertTrue(self.read(os.path.join(self.dest, "blog", "post.html")).startswith("<main>"))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.html")))
+
+class TestLiveReloadServer(unittest.TestCase):
+    def test_inject_livereload(self):
+        html = inject_livereload(b"<html><body><p>x</p></body></html>")
+        self.assertEqual(html, b"<html><body><p>x</p>" + LIVERELOAD_SCRIPT.encode() + b"</body></html>")
+        self.assertTrue(inject_livereload(b"<p>x</p>").endswith(LIVERELOAD_SCRIPT.encode()))
+
+    def test_reloader_wait(self):
+        reloader = Reloader()
+        self.assertEqual(reloader.wait(0, timeout=0), 0)
+        reloader.notify()
+        self.assertEqual(reloader.wait(0, timeout=0), 1)
+
+    def test_serves_html_with_script(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, "index.html"), "<body>hi</body>")
+            server = serve(tmp, 0, Reloader())
+            try:
+                port = server.server_address[1]
+                # The request log is written from the server thread
+                with mock.patch.object(LiveReloadHandler, "log_message"):
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/") as response:
+                        body = response.read()
+            finally:
+                server.shutdown()
+                server.server_close()
+        self.assertIn(LIVERELOAD_SCRIPT.encode(), body)
+
+if __name__ == '__main__':
+    unittest.main()
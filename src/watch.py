@@ -0,0 +1,314 @@
+from functions import generate_page, page_template
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from page_index import is_page, page_dest, scan_pages
+from sync import sync_files
+import argparse
+import ctypes
+import ctypes.util
+import functools
+import os
+import select
+import struct
+import threading
+import time
+import main as build
+
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVERELOAD_PATH}").onmessage = '
+    'function () { location.reload(); };</script>'
+)
+DEBOUNCE = 0.05
+
+def dest_for(src, content_dir, dest_dir):
+    folder, filename = os.path.split(os.path.join(dest_dir, os.path.relpath(src, content_dir)))
+    return os.path.join(folder, page_dest(filename))
+
+def is_under(path, folder):
+    return os.path.commonpath([os.path.abspath(path), os.path.abspath(folder)]) == os.path.abspath(folder)
+
+class PollingWatcher():
+    def __init__(self, paths, interval=0.5):
+        self.paths = paths
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        files = {}
+        for path in self.paths:
+            if os.path.isdir(path):
+                self.scan_dir(path, files)
+            elif os.path.exists(path):
+                stat = os.stat(path)
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def scan_dir(self, folder, files):
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.scan_dir(entry.path, files)
+                else:
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self):
+        current = self.scan()
+        previous, self.snapshot = self.snapshot, current
+        changed = {path for path, state in current.items() if previous.get(path) != state}
+        changed.update(path for path in previous if path not in current)
+        return changed
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+class InotifyWatcher():
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_ISDIR = 0x40000000
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, paths):
+        library = ctypes.util.find_library("c")
+        if library is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        # Single files are watched through their folder, filtered by name
+        self.files = set()
+        for path in paths:
+            if os.path.isdir(path):
+                self.add_tree(path)
+            else:
+                self.files.add(path)
+                self.add_watch(os.path.dirname(path), recursive=False)
+
+    def add_watch(self, folder, recursive=True):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder or "."), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {folder}")
+        self.dirs[wd] = (folder, recursive)
+
+    def add_tree(self, folder):
+        self.add_watch(folder)
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.add_tree(entry.path)
+
+    def read_events(self, changed):
+        data = os.read(self.fd, 65536)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if wd not in self.dirs or not name:
+                continue
+            folder, recursive = self.dirs[wd]
+            path = os.path.join(folder, name)
+            if not recursive:
+                if path in self.files:
+                    changed.add(path)
+            elif mask & self.IN_ISDIR:
+                # A new folder is watched too, and whatever it already holds counts as changed
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO) and os.path.isdir(path):
+                    self.add_tree(path)
+                    changed.update(PollingWatcher([path]).snapshot)
+            else:
+                changed.add(path)
+
+    def wait(self, timeout=None):
+        changed = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed
+        self.read_events(changed)
+        # Editors write a file in several steps, gather them into one change
+        while True:
+            ready, _, _ = select.select([self.fd], [], [], DEBOUNCE)
+            if not ready:
+                return changed
+            self.read_events(changed)
+
+    def close(self):
+        os.close(self.fd)
+
+def make_watcher(paths, backend="auto", interval=0.5):
+    if backend in ("auto", "inotify"):
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            if backend == "inotify":
+                raise
+    return PollingWatcher(paths, interval)
+
+def page_templates(index, template_path):
+    # Every template a page may be rendered with, so they can all be watched
+    return sorted({template_path} | {page_template(template_path, page.meta) for page in index})
+
+def rebuild(changed, content_dir, template_path, static_dir, dest_dir, basepath="/"):
+    # Returns the number of pages rendered for this set of changed paths
+    changed = {os.path.normpath(path) for path in changed}
+    index = scan_pages(content_dir, dest_dir).load_meta()
+    everything = os.path.normpath(template_path) in changed
+    pages = []
+    for page in index:
+        template = os.path.normpath(page_template(template_path, page.meta))
+        if not everything and template not in changed and os.path.normpath(page.src) not in changed:
+            continue
+        if page.is_draft():
+            # A page that became a draft takes its output with it
+            if os.path.exists(page.dest):
+                print(f"Removing {page.dest}, its source is a draft")
+                os.remove(page.dest)
+        else:
+            pages.append((page.src, page.dest))
+    for path in sorted(changed):
+        if not is_page(os.path.basename(path)) or not is_under(path, content_dir) or os.path.exists(path):
+            continue
+        dest = dest_for(path, content_dir, dest_dir)
+        if os.path.exists(dest):
+            print(f"Removing {dest}, its source is gone")
+            os.remove(dest)
+    headers = index.headers()
+    for src, dest in pages:
+        generate_page(src, template_path, dest, basepath, header=headers[src])
+    if any(is_under(path, static_dir) for path in changed):
+        sync_files(static_dir, dest_dir)
+    return len(pages)
+
+class Reloader():
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+def inject_livereload(html):
+    index = html.rfind(b"</body>")
+    if index == -1:
+        return html + LIVERELOAD_SCRIPT.encode()
+    return html[:index] + LIVERELOAD_SCRIPT.encode() + html[index:]
+
+class LiveReloadHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, reloader=None, **kwargs):
+        self.reloader = reloader
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        url_path = self.path.split("?", 1)[0]
+        if url_path == LIVERELOAD_PATH:
+            return self.send_events()
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and url_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            return self.send_html(path)
+        return super().do_GET()
+
+    def send_html(self, path):
+        with open(path, "rb") as f:
+            body = inject_livereload(f.read())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.reloader.version
+        try:
+            while True:
+                new_version = self.reloader.wait(version, timeout=15)
+                # A comment line keeps idle connections open
+                message = b"data: reload\n\n" if new_version != version else b": ping\n\n"
+                version = new_version
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+def serve(dest_dir, port, reloader):
+    handler = functools.partial(LiveReloadHandler, directory=dest_dir, reloader=reloader)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the site on changes and serve docs/ with live reload")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--backend", choices=("auto", "poll", "inotify"), default="auto")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between polls")
+    args = parser.parse_args(argv)
+
+    build.main(["--sync"])
+    reloader = Reloader()
+    server = serve("docs", args.port, reloader)
+    templates = page_templates(scan_pages("content", "docs").load_meta(), "template.html")
+    watcher = make_watcher(["content", "static"] + templates, args.backend, args.interval)
+    print(f"Serving docs/ on http://localhost:{args.port}, watching with {type(watcher).__name__}")
+    try:
+        while True:
+            changed = watcher.wait()
+            if not changed:
+                continue
+            start = time.perf_counter()
+            try:
+                count = rebuild(changed, "content", "template.html", "static", "docs")
+            except Exception as e:
+                print(f"Rebuild failed: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {count} page(s) for {len(changed)} changed file(s) in {elapsed:.1f} ms")
+            # Front matter may have named a template that is not watched yet
+            if any(is_under(path, "content") for path in changed):
+                current = page_templates(scan_pages("content", "docs").load_meta(), "template.html")
+                if current != templates:
+                    watcher.close()
+                    templates = current
+                    watcher = make_watcher(["content", "static"] + templates, args.backend, args.interval)
+            reloader.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()